@@ -1,41 +1,70 @@
+import asyncio
 import secrets
 import os
+import time
+import urllib.parse
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
-from jose import jwt
+import jwt
 import bcrypt
 from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
 
 from api_server.database import (
     create_user,
     get_user_by_email,
+    get_user_by_id,
+    get_cached_user,
+    user_changed_since,
+    has_active_subscription,
     create_magic_link,
-    get_magic_link,
-    use_magic_link,
+    consume_magic_link,
     update_user_password,
 )
-from api_server.email_provider import send_email
-
-SECRET_KEY = os.getenv("SECRET_KEY", secrets.token_hex(32))
+from api_server.auth_cache import get_cached_token_payload
+from api_server.email_provider import email_queue
+
+SECRET_KEY = os.getenv("SECRET_KEY")
+if not SECRET_KEY:
+    # A per-process key invalidates every token on restart and differs between workers
+    SECRET_KEY = secrets.token_hex(32)
+    print("[Auth] WARNING: SECRET_KEY is not set, using a random key for this process. "
+          "Sessions will not survive restarts or work across multiple workers.")
 ALGORITHM = "HS256"
 TOKEN_EXPIRY_HOURS = 24
+# How long the subscription claims baked into a token can stand in for the
+# users row before get_current_user goes back to the database.
+CLAIMS_TTL_SECONDS = int(os.getenv("AUTH_CLAIMS_TTL", "60"))
 
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:4321")
 
+# bcrypt work factor. Each +1 doubles the cost of hashing and verifying.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
 
-def send_magic_link_email(email: str, magic_link: str) -> bool:
-    """Send magic link email via the configured email provider."""
-    subject = "Sign in to Lead Extractor"
-
-    text = (
-        f"Hello,\n\n"
-        f"Click the link below to sign in to Lead Extractor:\n\n"
-        f"{magic_link}\n\n"
-        f"This link will expire in {TOKEN_EXPIRY_HOURS} hours.\n\n"
-        f"If you didn't request this, please ignore this email."
-    )
-
-    html = f"""
+# bcrypt releases the GIL while hashing, so running it on a thread pool keeps
+# the event loop free and lets concurrent logins use every core.
+_BCRYPT_POOL = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="bcrypt")
+
+# Caps the password checks waiting on the pool so a login burst queues here
+# instead of piling work onto the executor. Created on first use so it binds
+# to the running loop.
+BCRYPT_MAX_PENDING = 2 * (os.cpu_count() or 1)
+BCRYPT_MAX_PASSWORD_BYTES = 72
+_bcrypt_slots: Optional[asyncio.Semaphore] = None
+
+
+_MAGIC_LINK_SUBJECT = "Sign in to Lead Extractor"
+
+_MAGIC_LINK_TEXT_TEMPLATE = (
+    "Hello,\n\n"
+    "Click the link below to sign in to Lead Extractor:\n\n"
+    "{magic_link}\n\n"
+    "This link will expire in {expiry} hours.\n\n"
+    "If you didn't request this, please ignore this email."
+)
+
+_MAGIC_LINK_HTML_TEMPLATE = """
     <div style="font-family: 'Inter', -apple-system, sans-serif; max-width: 480px; margin: 0 auto; padding: 32px;">
       <h2 style="color: #1f2937; margin-bottom: 16px;">Sign in to Lead Extractor</h2>
       <p style="color: #4b5563; line-height: 1.6;">Click the button below to securely sign in to your account:</p>
@@ -47,7 +76,7 @@ def send_magic_link_email(email: str, magic_link: str) -> bool:
         </a>
       </div>
       <p style="color: #9ca3af; font-size: 13px; line-height: 1.5;">
-        This link will expire in {TOKEN_EXPIRY_HOURS} hours.<br>
+        This link will expire in {expiry} hours.<br>
         If you didn't request this, please ignore this email.
       </p>
       <hr style="border: none; border-top: 1px solid #e5e7eb; margin: 24px 0;">
@@ -55,7 +84,12 @@ def send_magic_link_email(email: str, magic_link: str) -> bool:
     </div>
     """
 
-    return send_email(email, subject, html, text)
+
+def send_magic_link_email(email: str, magic_link: str) -> bool:
+    """Queue the magic link email for delivery via the configured email provider."""
+    text = _MAGIC_LINK_TEXT_TEMPLATE.format(magic_link=magic_link, expiry=TOKEN_EXPIRY_HOURS)
+    html = _MAGIC_LINK_HTML_TEMPLATE.format(magic_link=magic_link, expiry=TOKEN_EXPIRY_HOURS)
+    return email_queue.enqueue(email, _MAGIC_LINK_SUBJECT, html, text)
 
 
 def register_user(email: str, redirect_url: Optional[str] = None) -> tuple[bool, str]:
@@ -75,10 +109,9 @@ def register_user(email: str, redirect_url: Optional[str] = None) -> tuple[bool,
 
     magic_link = f"{FRONTEND_URL}/auth/verify?token={token}"
     if redirect_url:
-        import urllib.parse
         magic_link += f"&redirect={urllib.parse.quote(redirect_url)}"
 
-    # Send email
+    # Send email (delivered in the background, with retries)
     success = send_magic_link_email(email, magic_link)
 
     if not success:
@@ -88,38 +121,29 @@ def register_user(email: str, redirect_url: Optional[str] = None) -> tuple[bool,
 
 
 def verify_magic_link(token: str) -> Optional[dict]:
-    """Verify a magic link and return user info."""
-    magic_link = get_magic_link(token)
+    """Verify a magic link and return the user's row."""
+    user_id = consume_magic_link(token)
 
-    if not magic_link:
+    if user_id is None:
         return None
 
-    # Check if expired
-    expires_at = datetime.fromisoformat(magic_link["expires_at"])
-    if datetime.utcnow() > expires_at:
-        return None
+    return get_user_by_id(user_id)
 
-    # Mark as used
-    use_magic_link(token)
 
-    # Return user info
-    from api_server.database import get_user_by_id
-    user = get_user_by_id(magic_link["user_id"])
+def create_access_token(user: dict, read_at: float) -> dict:
+    """Create a JWT access token for a user and return it with cookie settings.
 
-    if user:
-        return {
-            "id": user["id"],
-            "email": user["email"],
-        }
-
-    return None
-
-
-def create_access_token(user_id: int, email: str) -> dict:
-    """Create a JWT access token for a user and return it with cookie settings."""
+    The subscription claims come from the given users row, and read_at must
+    be a time.time() taken before that row was read, so a write that lands
+    in between still invalidates the claims.
+    """
     payload = {
-        "user_id": user_id,
-        "email": email,
+        "user_id": user["id"],
+        "email": user["email"],
+        "subscription_tier": user.get("subscription_tier", "free"),
+        "subscription_expires_at": user.get("subscription_expires_at"),
+        "job_credits": user.get("job_credits", 0),
+        "claims_ver": read_at,
         "exp": datetime.utcnow() + timedelta(hours=TOKEN_EXPIRY_HOURS),
     }
     token = jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
@@ -131,18 +155,22 @@ def create_access_token(user_id: int, email: str) -> dict:
     }
 
 
-def decode_access_token(token: str) -> Optional[dict]:
-    """Decode and verify a JWT access token."""
+def _verify_access_token(token: str) -> Optional[dict]:
+    """Verify a JWT access token's signature and expiry."""
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except jwt.ExpiredSignatureError:
         return None
     except jwt.InvalidTokenError:
         return None
 
 
-def get_current_user(request: Request = None, authorization: str = None) -> Optional[dict]:
+def decode_access_token(token: str) -> Optional[dict]:
+    """Decode and verify a JWT access token."""
+    return get_cached_token_payload(token, _verify_access_token)
+
+
+async def get_current_user(request: Request = None, authorization: str = None) -> Optional[dict]:
     """Get the current user from cookie or Authorization header."""
     token = None
     
@@ -153,9 +181,8 @@ def get_current_user(request: Request = None, authorization: str = None) -> Opti
     # Fall back to Authorization header
     if not token and authorization:
         # Extract token from "Bearer <token>"
-        parts = authorization.split()
-        if len(parts) == 2 and parts[0].lower() == "bearer":
-            token = parts[1]
+        if authorization[:7].lower() == "bearer ":
+            token = authorization[7:].strip()
 
     if not token:
         return None
@@ -165,61 +192,127 @@ def get_current_user(request: Request = None, authorization: str = None) -> Opti
     if not payload:
         return None
 
-    from api_server.database import get_user_by_id
-    user = get_user_by_id(payload["user_id"])
+    # Freshly issued tokens carry the subscription fields; trust them until
+    # they age out or the user row is written to.
+    claims_ver = payload.get("claims_ver")
+    if (
+        claims_ver is not None
+        and time.time() - claims_ver < CLAIMS_TTL_SECONDS
+        and not user_changed_since(payload["user_id"], claims_ver)
+    ):
+        return _session_user(payload["user_id"], payload)
+
+    # Only a cache miss needs the database, and only that part leaves the loop
+    user = get_cached_user(payload["user_id"])
+    if user is None:
+        user = await run_in_threadpool(get_user_by_id, payload["user_id"])
 
     if user:
-        return {
-            "id": user["id"],
-            "email": user["email"],
-            "subscription_tier": user.get("subscription_tier", "free"),
-            "subscription_expires_at": user.get("subscription_expires_at"),
-            "job_credits": user.get("job_credits", 0),
-        }
+        return _session_user(user["id"], user)
 
     return None
 
 
-def hash_password(password: str) -> str:
-    """Hash a password using bcrypt."""
-    salt = bcrypt.gensalt()
-    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+def _session_user(user_id: int, fields: dict) -> dict:
+    """Build the current-user dict from token claims or a cached users row.
 
+    Both sources can be up to a minute old, so a subscription that lapsed in
+    the meantime is reported as free rather than trusted until the next refresh.
+    """
+    tier = fields.get("subscription_tier", "free")
+    if tier != "free" and not has_active_subscription(fields):
+        tier = "free"
+    return {
+        "id": user_id,
+        "email": fields["email"],
+        "subscription_tier": tier,
+        "subscription_expires_at": fields.get("subscription_expires_at"),
+        "job_credits": fields.get("job_credits", 0),
+    }
+
+
+def check_bcrypt_cost() -> float:
+    """Time one bcrypt hash and warn if BCRYPT_ROUNDS looks mistuned."""
+    start = time.perf_counter()
+    bcrypt.hashpw(b"benchmark-password", bcrypt.gensalt(rounds=BCRYPT_ROUNDS))
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    if elapsed_ms > 500:
+        print(f"[Auth] Warning: bcrypt with {BCRYPT_ROUNDS} rounds takes {elapsed_ms:.0f}ms per hash; consider lowering BCRYPT_ROUNDS")
+    elif elapsed_ms < 50:
+        print(f"[Auth] Warning: bcrypt with {BCRYPT_ROUNDS} rounds takes only {elapsed_ms:.0f}ms per hash; consider raising BCRYPT_ROUNDS")
 
-def verify_password(password: str, password_hash: str) -> bool:
-    """Verify a password against a hash."""
+    return elapsed_ms
+
+
+def hash_password(password: bytes) -> str:
+    """Hash a UTF-8 encoded password using bcrypt."""
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
+    return bcrypt.hashpw(password, salt).decode('utf-8')
+
+
+def verify_password(password: bytes, password_hash: str) -> bool:
+    """Verify a UTF-8 encoded password against a hash."""
     if not password_hash:
         return False
     try:
-        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+        return bcrypt.checkpw(password, password_hash.encode('utf-8'))
     except Exception:
         return False
 
 
-def register_with_password(email: str, password: str) -> tuple[bool, str, Optional[dict]]:
-    """Register a new user with email and password."""
-    user = get_user_by_email(email)
+async def hash_password_async(password: bytes) -> str:
+    """Hash a password on the bcrypt thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_BCRYPT_POOL, hash_password, password)
+
+
+async def verify_password_async(password: bytes, password_hash: str) -> bool:
+    """Verify a password on the bcrypt thread pool."""
+    global _bcrypt_slots
+
+    # Registration rejects longer passwords, so they can never match a hash
+    if not password_hash or len(password) > BCRYPT_MAX_PASSWORD_BYTES:
+        return False
+
+    if _bcrypt_slots is None:
+        _bcrypt_slots = asyncio.Semaphore(BCRYPT_MAX_PENDING)
+    async with _bcrypt_slots:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_BCRYPT_POOL, verify_password, password, password_hash)
+
+
+async def register_with_password(email: str, password: bytes) -> tuple[bool, str, Optional[dict]]:
+    """Register a new user with email and UTF-8 encoded password.
+
+    On success the user's row is returned, for building the session token.
+
+    Database calls go to the threadpool, since they can wait on the
+    connection pool.
+    """
+    user = await run_in_threadpool(get_user_by_email, email)
 
     if user:
         # Check if user already has a password set
         if user.get("password_hash"):
             return False, "error.auth.email_already_registered", None
         # User exists but no password - set password
-        password_hash = hash_password(password)
-        update_user_password(user["id"], password_hash)
-        return True, "Password set successfully", {"id": user["id"], "email": email}
+        password_hash = await hash_password_async(password)
+        await run_in_threadpool(update_user_password, user["id"], password_hash)
+        return True, "Password set successfully", user
 
     # Create new user with password
-    user_id = create_user(email)
-    password_hash = hash_password(password)
-    update_user_password(user_id, password_hash)
+    user_id = await run_in_threadpool(create_user, email)
+    password_hash = await hash_password_async(password)
+    await run_in_threadpool(update_user_password, user_id, password_hash)
+    user = await run_in_threadpool(get_user_by_id, user_id)
 
-    return True, "User registered successfully", {"id": user_id, "email": email}
+    return True, "User registered successfully", user
 
 
-def login_with_password(email: str, password: str) -> tuple[bool, str, Optional[dict]]:
-    """Login with email and password."""
-    user = get_user_by_email(email)
+async def login_with_password(email: str, password: bytes) -> tuple[bool, str, Optional[dict]]:
+    """Login with email and UTF-8 encoded password, returning the user's row."""
+    user = await run_in_threadpool(get_user_by_email, email)
 
     if not user:
         return False, "error.auth.user_not_found", None
@@ -227,7 +320,7 @@ def login_with_password(email: str, password: str) -> tuple[bool, str, Optional[
     if not user.get("password_hash"):
         return False, "error.auth.uses_magic_link", None
 
-    if not verify_password(password, user["password_hash"]):
+    if not await verify_password_async(password, user["password_hash"]):
         return False, "error.auth.invalid_password", None
 
-    return True, "Login successful", {"id": user["id"], "email": user["email"]}
+    return True, "Login successful", user
@@ -0,0 +1,47 @@
+import hashlib
+import threading
+import time
+from typing import Callable, Optional
+
+from cachetools import TTLCache
+
+# Verified payloads, so a browser reusing its cookie skips the HMAC check and
+# JSON parse. Tokens are keyed by a truncated SHA-256 digest to keep the raw
+# credentials out of memory and the keys small. Rejected tokens are remembered
+# briefly as well, so a bad cookie isn't re-verified on every request.
+_payload_cache = TTLCache(maxsize=10000, ttl=300)
+_rejected_cache = TTLCache(maxsize=4096, ttl=30)
+_lock = threading.Lock()
+
+
+def _token_key(token: str) -> bytes:
+    """Cache key for a token."""
+    return hashlib.sha256(token.encode()).digest()[:16]
+
+
+def get_cached_token_payload(token: str, verify: Callable[[str], Optional[dict]]) -> Optional[dict]:
+    """Return the payload for a token, calling verify() only on a cache miss."""
+    key = _token_key(token)
+    with _lock:
+        payload = _payload_cache.get(key)
+        rejected = payload is None and key in _rejected_cache
+
+    if rejected:
+        return None
+
+    if payload is not None:
+        # Cached entries must not outlive the token itself
+        if payload["exp"] > time.time():
+            return payload
+        with _lock:
+            _payload_cache.pop(key, None)
+        return None
+
+    payload = verify(token)
+
+    with _lock:
+        if payload is None:
+            _rejected_cache[key] = True
+        else:
+            _payload_cache[key] = payload
+    return payload
@@ -1,38 +1,163 @@
+import atexit
 import sqlite3
-import json
 import os
-from datetime import datetime
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
 from typing import Optional, List
 from contextlib import contextmanager
 
+import orjson
+from cachetools import TTLCache
+
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./data/leads.db")
 DATABASE_PATH = DATABASE_URL.replace("sqlite:///", "")
 
 os.makedirs(os.path.dirname(os.path.abspath(DATABASE_PATH)) or ".", exist_ok=True)
 
+# User rows are read on every authenticated request, so keep recent ones in
+# memory. Emails never change, so the email index only maps to an id and all
+# invalidation goes through the id-keyed cache.
+_user_cache = TTLCache(maxsize=1024, ttl=30)
+_user_ids_by_email = TTLCache(maxsize=1024, ttl=30)
+_user_cache_lock = threading.RLock()
+# When each user row was last written, so snapshots of it held elsewhere
+# (e.g. JWT claims) can tell whether they are out of date. Entries have to
+# outlive the window in which auth trusts those claims (AUTH_CLAIMS_TTL).
+_user_write_times = TTLCache(maxsize=4096, ttl=max(300, int(os.getenv("AUTH_CLAIMS_TTL", "60"))))
+# Result counts per job, as (completed_at, count). Results are written once per
+# run, and every run gets a new completed_at, so an entry left over from an
+# earlier run (possibly by another process) is never served. Writes, requeues
+# and deletes in this process also drop the entry.
+_result_counts = TTLCache(maxsize=1024, ttl=3600)
+_result_counts_lock = threading.Lock()
+
+
+# Run once on every new connection. journal_mode=WAL is stored in the database
+# file; the others only last for the connection.
+_CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+
+# Long-lived connections shared through a bounded pool, so queries don't pay
+# for opening the file and applying pragmas every time, and a burst of
+# threadpool requests can't open an unbounded number of handles.
+DATABASE_POOL_SIZE = int(os.getenv("DATABASE_POOL_SIZE", "10"))
+DATABASE_POOL_TIMEOUT = 30  # seconds to wait for a free connection
+
+# LIFO hands out the most recently used connection, whose page cache is warm
+_pool: queue.LifoQueue = queue.LifoQueue(maxsize=DATABASE_POOL_SIZE)
+_pool_opened = 0
+_pool_lock = threading.Lock()
+
+
+# (description, column names) of the last query seen by _dict_factory. sqlite3
+# hands every row of a query the same description tuple, so the names are
+# built once per query; holding the tuple keeps its identity from being reused.
+_row_columns = (None, ())
+
+
+def _dict_factory(cursor: sqlite3.Cursor, row: tuple) -> dict:
+    """Build rows as plain dicts, so callers don't copy them out of sqlite3.Row."""
+    global _row_columns
+    description = cursor.description
+    cached_description, columns = _row_columns
+    if description is not cached_description:
+        columns = tuple(col[0] for col in description)
+        # One assignment, so other threads never see a mismatched pair
+        _row_columns = (description, columns)
+    return dict(zip(columns, row))
+
+
+def _connect() -> sqlite3.Connection:
+    """Open a new database connection."""
+    conn = sqlite3.connect(DATABASE_PATH, check_same_thread=False)
+    conn.row_factory = _dict_factory
+    for pragma in _CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
 
+@contextmanager
 def get_db():
-    """Get database connection."""
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Check a connection out of the pool for the duration of the block."""
+    global _pool_opened
+    try:
+        conn = _pool.get_nowait()
+    except queue.Empty:
+        with _pool_lock:
+            can_open = _pool_opened < DATABASE_POOL_SIZE
+            if can_open:
+                _pool_opened += 1
+        if can_open:
+            try:
+                conn = _connect()
+            except BaseException:
+                with _pool_lock:
+                    _pool_opened -= 1
+                raise
+        else:
+            try:
+                conn = _pool.get(timeout=DATABASE_POOL_TIMEOUT)
+            except queue.Empty:
+                raise sqlite3.OperationalError("Timed out waiting for a database connection") from None
+    try:
+        yield conn
+    finally:
+        _pool.put_nowait(conn)
+
+
+def close_all():
+    """Close every pooled database connection."""
+    global _pool_opened
+    while True:
+        try:
+            conn = _pool.get_nowait()
+        except queue.Empty:
+            break
+        conn.close()
+        with _pool_lock:
+            _pool_opened -= 1
+
+
+atexit.register(close_all)
 
 
 @contextmanager
 def get_db_cursor():
     """Get database cursor with automatic commit."""
-    conn = get_db()
-    try:
+    with get_db() as conn:
         cursor = conn.cursor()
-        yield cursor
-        conn.commit()
-    finally:
-        conn.close()
+        try:
+            yield cursor
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
 
 
-def init_db():
-    """Initialize database tables."""
-    with get_db_cursor() as cursor:
+# Bump together with a new step in _migrate(). init_db() skips all DDL once the
+# database file reports this version through PRAGMA user_version.
+SCHEMA_VERSION = 5
+
+
+def _table_columns(cursor, table: str) -> set:
+    """Get the column names of a table."""
+    cursor.execute(f"PRAGMA table_info({table})")
+    return {row["name"] for row in cursor.fetchall()}
+
+
+def _migrate(cursor, version: int):
+    """Bring the schema from the given version up to SCHEMA_VERSION."""
+    if version < 1:
         # Users table
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS users (
@@ -47,16 +172,11 @@ def init_db():
             )
         """)
 
-        # Migration: Add password_hash column if it doesn't exist
-        try:
-            cursor.execute("SELECT password_hash FROM users LIMIT 1")
-        except sqlite3.OperationalError:
+        # Columns added after the first release
+        user_columns = _table_columns(cursor, "users")
+        if "password_hash" not in user_columns:
             cursor.execute("ALTER TABLE users ADD COLUMN password_hash TEXT")
-
-        # Migration: Add subscription columns if they don't exist
-        try:
-            cursor.execute("SELECT subscription_tier FROM users LIMIT 1")
-        except sqlite3.OperationalError:
+        if "subscription_tier" not in user_columns:
             cursor.execute("ALTER TABLE users ADD COLUMN subscription_tier TEXT DEFAULT 'free'")
             cursor.execute("ALTER TABLE users ADD COLUMN subscription_expires_at TEXT")
             cursor.execute("ALTER TABLE users ADD COLUMN job_credits INTEGER DEFAULT 0")
@@ -102,22 +222,13 @@ def init_db():
             )
         """)
 
-        # Migration: Add deducted_credit column if it doesn't exist
-        try:
-            cursor.execute("SELECT deducted_credit FROM jobs LIMIT 1")
-        except sqlite3.OperationalError:
-            cursor.execute("ALTER TABLE jobs ADD COLUMN deducted_credit INTEGER DEFAULT 0")
-
-        # Migration: Add new columns if they don't exist (basic migration)
-        # import sqlite3 - already imported at top
-        for col in ["require_no_website", "require_no_social", "require_phone", "require_address"]:
-            try:
+        # Columns added after the first release
+        job_columns = _table_columns(cursor, "jobs")
+        for col in ["deducted_credit", "require_no_website", "require_no_social", "require_phone", "require_address"]:
+            if col not in job_columns:
                 cursor.execute(f"ALTER TABLE jobs ADD COLUMN {col} INTEGER DEFAULT 0")
-            except sqlite3.OperationalError:
-                pass # Column already exists
-    
-    # Results table
-    with get_db_cursor() as cursor:
+
+        # Results table
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS results (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -141,96 +252,246 @@ def init_db():
             )
         """)
 
+        # Indexes for the per-user and per-job lookups. users.email and
+        # magic_links.token are already indexed through UNIQUE.
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_user_created ON jobs(user_id, created_at DESC)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_api_keys_user_active ON api_keys(user_id, is_active)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_results_job ON results(job_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_magic_links_user ON magic_links(user_id)")
+
+    if version < 2:
+        # One row per lead instead of one JSON blob per job, so results can be
+        # written in bulk and read a page at a time.
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS result_rows (
+                job_id INTEGER NOT NULL,
+                idx INTEGER NOT NULL,
+                data TEXT NOT NULL,
+                PRIMARY KEY (job_id, idx),
+                FOREIGN KEY (job_id) REFERENCES jobs(id) ON DELETE CASCADE
+            ) WITHOUT ROWID
+        """)
+
+        # Jobs used to be deleted without their results; leave those orphans
+        # behind with the old table
+        cursor.execute("SELECT r.job_id, r.data FROM results r JOIN jobs j ON j.id = r.job_id")
+        for row in cursor.fetchall():
+            cursor.executemany(
+                "INSERT OR IGNORE INTO result_rows (job_id, idx, data) VALUES (?, ?, ?)",
+                ((row["job_id"], idx, orjson.dumps(lead)) for idx, lead in enumerate(orjson.loads(row["data"])))
+            )
+        cursor.execute("DROP TABLE results")
+
+    if version < 3:
+        # Sign-in only ever looks up unused links; keep that index small
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_magic_links_unused ON magic_links(token) WHERE used_at IS NULL"
+        )
+
+    if version < 4:
+        # Job lists are ordered and paged by id, which also breaks ties between
+        # jobs created in the same batch
+        cursor.execute("DROP INDEX IF EXISTS idx_jobs_user_created")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_user_id ON jobs(user_id, id DESC)")
+
+    if version < 5:
+        # Stripe event ids already fulfilled, so redelivered webhooks are no-ops
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS stripe_events (
+                event_id TEXT PRIMARY KEY,
+                processed_at TEXT NOT NULL
+            ) WITHOUT ROWID
+        """)
+
+
+def init_db():
+    """Initialize database tables."""
+    with get_db_cursor() as cursor:
+        # WAL lets readers proceed while a writer is active; the mode is stored
+        # in the database file, so switch it before creating any tables.
+        cursor.execute("PRAGMA journal_mode=WAL")
+
+        cursor.execute("PRAGMA user_version")
+        if cursor.fetchone()["user_version"] >= SCHEMA_VERSION:
+            return
+
+        # Take the write lock up front and re-check, in case another worker
+        # migrated the file while we were waiting for it.
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("PRAGMA user_version")
+        version = cursor.fetchone()["user_version"]
+        if version < SCHEMA_VERSION:
+            _migrate(cursor, version)
+            cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+
+def _cache_user(user: dict) -> None:
+    """Store a user row in the in-memory cache."""
+    with _user_cache_lock:
+        _user_cache[user["id"]] = user
+        _user_ids_by_email[user["email"]] = user["id"]
+
+
+def get_cached_user(user_id: int) -> Optional[dict]:
+    """Return a copy of a cached user row, if present, without touching the database."""
+    with _user_cache_lock:
+        user = _user_cache.get(user_id)
+    return dict(user) if user else None
+
+
+def invalidate_user(user_id: int) -> None:
+    """Drop a user from the in-memory cache after a write."""
+    with _user_cache_lock:
+        _user_cache.pop(user_id, None)
+        _user_write_times[user_id] = time.time()
+
+
+def now_iso() -> str:
+    """Current UTC time as the ISO 8601 string stored in timestamp columns.
+
+    ISO strings of the same format sort chronologically, so stored timestamps
+    can be compared against this directly without parsing.
+    """
+    return datetime.utcnow().isoformat()
+
+
+def has_active_subscription(user: dict) -> bool:
+    """Check whether a user row or session has an unexpired week/month plan."""
+    expires_at = user.get("subscription_expires_at")
+    return (
+        user.get("subscription_tier") in ("week", "month")
+        and bool(expires_at)
+        and expires_at > now_iso()
+    )
+
+
+def user_changed_since(user_id: int, timestamp: float) -> bool:
+    """Check whether a user row was written after the given UNIX timestamp."""
+    with _user_cache_lock:
+        return _user_write_times.get(user_id, 0) >= timestamp
+
 
 def create_user(email: str) -> int:
-    """Create a new user."""
-    now = datetime.utcnow().isoformat()
+    """Create a new user and prime the cache with the inserted row."""
+    now = now_iso()
     with get_db_cursor() as cursor:
         cursor.execute(
-            "INSERT INTO users (email, created_at, updated_at) VALUES (?, ?, ?)",
+            "INSERT INTO users (email, created_at, updated_at) VALUES (?, ?, ?) RETURNING *",
             (email, now, now)
         )
-        return cursor.lastrowid
+        user = cursor.fetchall()[0]
+    _cache_user(user)
+    return user["id"]
 
 
 def get_user_by_email(email: str) -> Optional[dict]:
     """Get user by email."""
+    with _user_cache_lock:
+        user_id = _user_ids_by_email.get(email)
+    if user_id is not None:
+        user = get_cached_user(user_id)
+        if user:
+            return user
+
     with get_db_cursor() as cursor:
         cursor.execute("SELECT * FROM users WHERE email = ?", (email,))
-        row = cursor.fetchone()
-        return dict(row) if row else None
+        user = cursor.fetchone()
+    if not user:
+        return None
+    _cache_user(user)
+    return dict(user)
 
 
 def get_user_by_id(user_id: int) -> Optional[dict]:
     """Get user by ID."""
+    user = get_cached_user(user_id)
+    if user:
+        return user
+
     with get_db_cursor() as cursor:
         cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
-        row = cursor.fetchone()
-        return dict(row) if row else None
+        user = cursor.fetchone()
+    if not user:
+        return None
+    _cache_user(user)
+    return dict(user)
 
 
 def update_user_password(user_id: int, password_hash: str) -> bool:
     """Update user's password hash."""
-    now = datetime.utcnow().isoformat()
+    now = now_iso()
     with get_db_cursor() as cursor:
         cursor.execute(
             "UPDATE users SET password_hash = ?, updated_at = ? WHERE id = ?",
             (password_hash, now, user_id)
         )
-        return cursor.rowcount > 0
+        updated = cursor.rowcount > 0
+    invalidate_user(user_id)
+    return updated
 
 
-def update_user_subscription(user_id: int, tier: str) -> bool:
-    """Update user's subscription or job credits after payment."""
-    from datetime import timedelta
+def _apply_subscription(cursor, user_id: int, tier: str) -> bool:
+    """Grant a purchased tier to a user within an open transaction."""
     now = datetime.utcnow()
-    
-    with get_db_cursor() as cursor:
-        if tier == "single":
-            # Add one job credit
-            cursor.execute(
-                "UPDATE users SET job_credits = job_credits + 1, updated_at = ? WHERE id = ?",
-                (now.isoformat(), user_id)
-            )
-        elif tier == "week":
-            expires = (now + timedelta(days=7)).isoformat()
-            cursor.execute(
-                "UPDATE users SET subscription_tier = ?, subscription_expires_at = ?, updated_at = ? WHERE id = ?",
-                ("week", expires, now.isoformat(), user_id)
-            )
-        elif tier == "month":
-            expires = (now + timedelta(days=30)).isoformat()
-            cursor.execute(
-                "UPDATE users SET subscription_tier = ?, subscription_expires_at = ?, updated_at = ? WHERE id = ?",
-                ("month", expires, now.isoformat(), user_id)
-            )
-        return cursor.rowcount > 0
 
-def use_job_credit(user_id: int) -> bool:
-    """Consume one job credit if the user has any. Returns True if successful."""
-    now = datetime.utcnow().isoformat()
+    if tier == "single":
+        # Add one job credit
+        cursor.execute(
+            "UPDATE users SET job_credits = job_credits + 1, updated_at = ? WHERE id = ?",
+            (now.isoformat(), user_id)
+        )
+    elif tier == "week":
+        expires = (now + timedelta(days=7)).isoformat()
+        cursor.execute(
+            "UPDATE users SET subscription_tier = ?, subscription_expires_at = ?, updated_at = ? WHERE id = ?",
+            ("week", expires, now.isoformat(), user_id)
+        )
+    elif tier == "month":
+        expires = (now + timedelta(days=30)).isoformat()
+        cursor.execute(
+            "UPDATE users SET subscription_tier = ?, subscription_expires_at = ?, updated_at = ? WHERE id = ?",
+            ("month", expires, now.isoformat(), user_id)
+        )
+    else:
+        return False
+    return cursor.rowcount > 0
+
+
+def fulfill_stripe_event(event_id: str, user_id: int, tier: str) -> Optional[bool]:
+    """Apply a paid tier once per Stripe event.
+
+    Recording the event and granting the tier share a transaction, so a
+    redelivered event never grants twice and a failed grant can be retried.
+    Returns None if the event was already processed.
+    """
     with get_db_cursor() as cursor:
         cursor.execute(
-            "UPDATE users SET job_credits = job_credits - 1, updated_at = ? WHERE id = ? AND job_credits > 0",
-            (now, user_id)
+            "INSERT OR IGNORE INTO stripe_events (event_id, processed_at) VALUES (?, ?)",
+            (event_id, now_iso())
         )
-        return cursor.rowcount > 0
+        if cursor.rowcount == 0:
+            return None
+        updated = _apply_subscription(cursor, user_id, tier)
+    invalidate_user(user_id)
+    return updated
 
 
 def refund_job_credit(user_id: int) -> bool:
     """Refund one job credit to the user."""
-    now = datetime.utcnow().isoformat()
+    now = now_iso()
     with get_db_cursor() as cursor:
         cursor.execute(
             "UPDATE users SET job_credits = job_credits + 1, updated_at = ? WHERE id = ?",
             (now, user_id)
         )
-        return cursor.rowcount > 0
+        updated = cursor.rowcount > 0
+    invalidate_user(user_id)
+    return updated
 
 
 def create_api_key(user_id: int, key_name: str, api_key: str) -> int:
     """Create a new API key for a user."""
-    now = datetime.utcnow().isoformat()
+    now = now_iso()
     with get_db_cursor() as cursor:
         cursor.execute(
             "INSERT INTO api_keys (user_id, key_name, api_key, created_at) VALUES (?, ?, ?, ?)",
@@ -240,24 +501,30 @@ def create_api_key(user_id: int, key_name: str, api_key: str) -> int:
 
 
 def get_api_keys(user_id: int) -> List[dict]:
-    """Get all API keys for a user."""
+    """Get all API keys for a user, with the key itself masked."""
     with get_db_cursor() as cursor:
         cursor.execute(
-            "SELECT id, key_name, is_active, created_at FROM api_keys WHERE user_id = ?",
+            "SELECT id, key_name, is_active, created_at, '****' AS key_preview FROM api_keys WHERE user_id = ?",
             (user_id,)
         )
-        return [dict(row) for row in cursor.fetchall()]
+        return cursor.fetchall()
+
 
+def get_key_resolution(user_id: int) -> Optional[dict]:
+    """Get what deciding a job's API key needs in one query.
 
-def get_active_api_key(user_id: int) -> Optional[str]:
-    """Get the first active API key for a user."""
+    The row has the user's first active api_key (or None) alongside their
+    subscription_tier, subscription_expires_at and job_credits.
+    """
     with get_db_cursor() as cursor:
         cursor.execute(
-            "SELECT api_key FROM api_keys WHERE user_id = ? AND is_active = 1 LIMIT 1",
+            """SELECT
+                   (SELECT api_key FROM api_keys WHERE user_id = u.id AND is_active = 1 LIMIT 1) AS api_key,
+                   subscription_tier, subscription_expires_at, job_credits
+               FROM users u WHERE id = ?""",
             (user_id,)
         )
-        row = cursor.fetchone()
-        return row["api_key"] if row else None
+        return cursor.fetchone()
 
 
 def delete_api_key(user_id: int, key_id: int) -> bool:
@@ -270,6 +537,47 @@ def delete_api_key(user_id: int, key_id: int) -> bool:
         return cursor.rowcount > 0
 
 
+_INSERT_JOB = """INSERT INTO jobs (
+    user_id, name, center_lat, center_lng, center_address,
+    categories, radius, require_no_website, require_no_social,
+    require_phone, require_address, min_rating, min_reviews, min_photos,
+    sort_by, deducted_credit, created_at, updated_at
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+
+
+def _job_values(
+    now: str,
+    user_id: int,
+    name: str,
+    center_lat: float,
+    center_lng: float,
+    center_address: str = None,
+    categories: List[str] = None,
+    radius: int = 5000,
+    require_no_website: bool = False,
+    require_no_social: bool = False,
+    require_phone: bool = False,
+    require_address: bool = False,
+    min_rating: float = None,
+    min_reviews: int = None,
+    min_photos: int = None,
+    sort_by: str = "score",
+    deducted_credit: bool = False,
+) -> tuple:
+    """Build the parameters for _INSERT_JOB."""
+    categories_json = orjson.dumps(categories).decode() if categories else None
+    return (
+        user_id, name, center_lat, center_lng, center_address,
+        categories_json, radius,
+        1 if require_no_website else 0,
+        1 if require_no_social else 0,
+        1 if require_phone else 0,
+        1 if require_address else 0,
+        min_rating, min_reviews, min_photos,
+        sort_by, 1 if deducted_credit else 0, now, now
+    )
+
+
 def create_job(
     user_id: int,
     name: str,
@@ -289,31 +597,45 @@ def create_job(
     deducted_credit: bool = False,
 ) -> int:
     """Create a new job."""
-    now = datetime.utcnow().isoformat()
-    categories_json = json.dumps(categories) if categories else None
-
     with get_db_cursor() as cursor:
-        cursor.execute(
-            """INSERT INTO jobs (
-                user_id, name, center_lat, center_lng, center_address,
-                categories, radius, require_no_website, require_no_social,
-                require_phone, require_address, min_rating, min_reviews, min_photos,
-                sort_by, deducted_credit, created_at, updated_at
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-            (
-                user_id, name, center_lat, center_lng, center_address,
-                categories_json, radius,
-                1 if require_no_website else 0,
-                1 if require_no_social else 0,
-                1 if require_phone else 0,
-                1 if require_address else 0,
-                min_rating, min_reviews, min_photos,
-                sort_by, 1 if deducted_credit else 0, now, now
-            )
-        )
+        cursor.execute(_INSERT_JOB, _job_values(
+            now_iso(), user_id, name, center_lat, center_lng, center_address,
+            categories, radius, require_no_website, require_no_social,
+            require_phone, require_address, min_rating, min_reviews, min_photos,
+            sort_by, deducted_credit,
+        ))
         return cursor.lastrowid
 
 
+def create_jobs(jobs: List[dict]) -> List[Optional[int]]:
+    """Create several jobs in one transaction.
+
+    Each dict holds create_job's keyword arguments. A job with deducted_credit
+    set consumes one of its user's credits in the same transaction, and is
+    skipped if the user has none left. Returns the new ids in the same order,
+    with None for skipped jobs.
+    """
+    now = now_iso()
+    job_ids = []
+    charged_users = set()
+    with get_db_cursor() as cursor:
+        for job in jobs:
+            if job.get("deducted_credit"):
+                cursor.execute(
+                    "UPDATE users SET job_credits = job_credits - 1, updated_at = ? WHERE id = ? AND job_credits > 0",
+                    (now, job["user_id"])
+                )
+                if cursor.rowcount == 0:
+                    job_ids.append(None)
+                    continue
+                charged_users.add(job["user_id"])
+            cursor.execute(_INSERT_JOB, _job_values(now, **job))
+            job_ids.append(cursor.lastrowid)
+    for user_id in charged_users:
+        invalidate_user(user_id)
+    return job_ids
+
+
 def get_job(job_id: int, user_id: int = None) -> Optional[dict]:
     """Get a job by ID."""
     with get_db_cursor() as cursor:
@@ -323,30 +645,42 @@ def get_job(job_id: int, user_id: int = None) -> Optional[dict]:
             cursor.execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
         row = cursor.fetchone()
         if row:
-            result = dict(row)
+            result = row
             if result.get("categories"):
-                result["categories"] = json.loads(result["categories"])
+                result["categories"] = orjson.loads(result["categories"])
             return result
         return None
 
 
-def get_jobs(user_id: int, limit: int = 50, offset: int = 0) -> List[dict]:
-    """Get all jobs for a user."""
+def get_jobs(user_id: int, limit: int = 50, offset: int = 0, before_id: Optional[int] = None) -> List[dict]:
+    """Get a user's jobs, newest first.
+
+    Pass the last id of the previous page as before_id to page by key instead
+    of by offset, which doesn't get slower on later pages.
+    """
     with get_db_cursor() as cursor:
-        cursor.execute(
-            """SELECT id, name, status, progress, total_businesses, leads_found,
-                      created_at, updated_at, completed_at
-               FROM jobs WHERE user_id = ? ORDER BY created_at DESC LIMIT ? OFFSET ?""",
-            (user_id, limit, offset)
-        )
-        return [dict(row) for row in cursor.fetchall()]
+        if before_id is not None:
+            cursor.execute(
+                """SELECT id, name, status, progress, total_businesses, leads_found,
+                          created_at, updated_at, completed_at
+                   FROM jobs WHERE user_id = ? AND id < ? ORDER BY id DESC LIMIT ?""",
+                (user_id, before_id, limit)
+            )
+        else:
+            cursor.execute(
+                """SELECT id, name, status, progress, total_businesses, leads_found,
+                          created_at, updated_at, completed_at
+                   FROM jobs WHERE user_id = ? ORDER BY id DESC LIMIT ? OFFSET ?""",
+                (user_id, limit, offset)
+            )
+        return cursor.fetchall()
 
 
 def count_jobs(user_id: int) -> int:
     """Count total jobs for a user."""
     with get_db_cursor() as cursor:
-        cursor.execute("SELECT COUNT(*) FROM jobs WHERE user_id = ?", (user_id,))
-        return cursor.fetchone()[0]
+        cursor.execute("SELECT COUNT(*) AS total FROM jobs WHERE user_id = ?", (user_id,))
+        return cursor.fetchone()["total"]
 
 
 def update_job_status(
@@ -358,7 +692,7 @@ def update_job_status(
     error_message: str = None,
 ) -> bool:
     """Update job status."""
-    now = datetime.utcnow().isoformat()
+    now = now_iso()
     updates = ["status = ?", "updated_at = ?"]
     values = [status, now]
 
@@ -395,39 +729,125 @@ def update_job_status(
         return cursor.rowcount > 0
 
 
-def delete_job(job_id: int, user_id: int) -> bool:
-    """Delete a job."""
+def delete_job(job_id: int, user_id: int) -> Optional[dict]:
+    """Delete a job. Returns the deleted row, or None if the user has no such job."""
     with get_db_cursor() as cursor:
-        cursor.execute("DELETE FROM jobs WHERE id = ? AND user_id = ?", (job_id, user_id))
-        return cursor.rowcount > 0
+        cursor.execute(
+            "DELETE FROM jobs WHERE id = ? AND user_id = ? RETURNING id, user_id, status, deducted_credit",
+            (job_id, user_id)
+        )
+        rows = cursor.fetchall()
+        # Foreign keys aren't enforced, so the job's results don't cascade
+        if rows:
+            cursor.execute("DELETE FROM result_rows WHERE job_id = ?", (job_id,))
+    with _result_counts_lock:
+        _result_counts.pop(job_id, None)
+    return rows[0] if rows else None
+
+
+def claim_unfinished_jobs(stale_after_seconds: int) -> List[dict]:
+    """Requeue queued or running jobs not updated for a while and return them.
+
+    Live processes keep their jobs' updated_at fresh, so only jobs whose
+    process stopped are taken. The reset and the read are one statement, and
+    the reset refreshes updated_at, so a job is claimed once even if two
+    processes look at the same time.
+    """
+    now = datetime.utcnow()
+    stale_before = (now - timedelta(seconds=stale_after_seconds)).isoformat()
+    with get_db_cursor() as cursor:
+        cursor.execute(
+            """UPDATE jobs SET status = 'queued', progress = 0, updated_at = ?
+               WHERE status IN ('queued', 'running') AND updated_at < ?
+               RETURNING id, user_id""",
+            (now.isoformat(), stale_before)
+        )
+        jobs = cursor.fetchall()
+    with _result_counts_lock:
+        for job in jobs:
+            _result_counts.pop(job["id"], None)
+    return jobs
+
+
+def touch_jobs(job_ids: List[int]) -> None:
+    """Mark jobs as still being worked on by this process."""
+    placeholders = ",".join("?" * len(job_ids))
+    with get_db_cursor() as cursor:
+        cursor.execute(
+            f"""UPDATE jobs SET updated_at = ?
+                WHERE id IN ({placeholders}) AND status IN ('queued', 'running')""",
+            (now_iso(), *job_ids)
+        )
+
+
+def requeue_job(job_id: int, user_id: int) -> bool:
+    """Reset a failed or cancelled job to queued, in a single statement."""
+    with get_db_cursor() as cursor:
+        cursor.execute(
+            """UPDATE jobs SET status = 'queued', progress = 0, error_message = NULL,
+                              completed_at = NULL, updated_at = ?
+               WHERE id = ? AND user_id = ? AND status IN ('failed', 'cancelled')
+               RETURNING id""",
+            (now_iso(), job_id, user_id)
+        )
+        requeued = len(cursor.fetchall()) > 0
+    if requeued:
+        with _result_counts_lock:
+            _result_counts.pop(job_id, None)
+    return requeued
 
 
 def create_result(job_id: int, data: List[dict]) -> int:
-    """Create results for a job."""
-    now = datetime.utcnow().isoformat()
-    data_json = json.dumps(data)
+    """Store the results for a job, one row per lead. Returns the row count."""
+    with get_db_cursor() as cursor:
+        cursor.execute("DELETE FROM result_rows WHERE job_id = ?", (job_id,))
+        cursor.executemany(
+            "INSERT INTO result_rows (job_id, idx, data) VALUES (?, ?, ?)",
+            ((job_id, idx, orjson.dumps(lead)) for idx, lead in enumerate(data))
+        )
+    with _result_counts_lock:
+        _result_counts.pop(job_id, None)
+    return len(data)
 
+
+def get_result(job_id: int) -> List[dict]:
+    """Get results for a job, in the order they were stored."""
+    with get_db_cursor() as cursor:
+        cursor.execute("SELECT data FROM result_rows WHERE job_id = ? ORDER BY idx", (job_id,))
+        return [orjson.loads(row["data"]) for row in cursor.fetchall()]
+
+
+def get_results_page(job_id: int, limit: int, offset: int) -> List[dict]:
+    """Get one page of results for a job.
+
+    Rows are numbered from 0 with no gaps, so the page is a primary key range
+    rather than an OFFSET scan.
+    """
     with get_db_cursor() as cursor:
         cursor.execute(
-            "INSERT INTO results (job_id, data, created_at) VALUES (?, ?, ?)",
-            (job_id, data_json, now)
+            "SELECT data FROM result_rows WHERE job_id = ? AND idx >= ? AND idx < ? ORDER BY idx",
+            (job_id, offset, offset + limit)
         )
-        return cursor.lastrowid
+        return [orjson.loads(row["data"]) for row in cursor.fetchall()]
 
 
-def get_result(job_id: int) -> Optional[List[dict]]:
-    """Get results for a job."""
+def count_results(job_id: int, completed_at: Optional[str]) -> int:
+    """Count the results stored for a job run, identified by its completed_at."""
+    with _result_counts_lock:
+        cached = _result_counts.get(job_id)
+    if cached is not None and cached[0] == completed_at:
+        return cached[1]
     with get_db_cursor() as cursor:
-        cursor.execute("SELECT data FROM results WHERE job_id = ?", (job_id,))
-        row = cursor.fetchone()
-        if row:
-            return json.loads(row["data"])
-        return None
+        cursor.execute("SELECT COUNT(*) AS total FROM result_rows WHERE job_id = ?", (job_id,))
+        total = cursor.fetchone()["total"]
+    with _result_counts_lock:
+        _result_counts[job_id] = (completed_at, total)
+    return total
 
 
 def create_magic_link(user_id: int, token: str, expires_at: datetime) -> int:
     """Create a magic link for authentication."""
-    now = datetime.utcnow().isoformat()
+    now = now_iso()
     with get_db_cursor() as cursor:
         cursor.execute(
             "INSERT INTO magic_links (user_id, token, expires_at, created_at) VALUES (?, ?, ?, ?)",
@@ -436,26 +856,32 @@ def create_magic_link(user_id: int, token: str, expires_at: datetime) -> int:
         return cursor.lastrowid
 
 
-def get_magic_link(token: str) -> Optional[dict]:
-    """Get a magic link by token."""
+def consume_magic_link(token: str) -> Optional[int]:
+    """Mark a magic link as used if it is unused and unexpired.
+
+    The check and the update are a single statement, so a link can only ever
+    be consumed once. Returns the link's user id, or None if it was invalid.
+    """
+    now = now_iso()
     with get_db_cursor() as cursor:
         cursor.execute(
-            "SELECT * FROM magic_links WHERE token = ? AND used_at IS NULL",
-            (token,)
+            """UPDATE magic_links SET used_at = ?
+               WHERE token = ? AND used_at IS NULL AND expires_at > ?
+               RETURNING user_id""",
+            (now, token, now)
         )
-        row = cursor.fetchone()
-        return dict(row) if row else None
+        rows = cursor.fetchall()
+    return rows[0]["user_id"] if rows else None
 
 
-def use_magic_link(token: str) -> bool:
-    """Mark a magic link as used."""
-    now = datetime.utcnow().isoformat()
+def purge_magic_links() -> int:
+    """Delete used and expired magic links. Returns the number removed."""
     with get_db_cursor() as cursor:
         cursor.execute(
-            "UPDATE magic_links SET used_at = ? WHERE token = ?",
-            (now, token)
+            "DELETE FROM magic_links WHERE used_at IS NOT NULL OR expires_at < ?",
+            (now_iso(),)
         )
-        return cursor.rowcount > 0
+        return cursor.rowcount
 
 
 init_db()
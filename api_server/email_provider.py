@@ -1,8 +1,17 @@
+import asyncio
 import os
 from typing import Optional
 
+import httpx
+
 RESEND_API_KEY = os.getenv("RESEND_API_KEY", "")
 FROM_EMAIL = os.getenv("FROM_EMAIL", "onboarding@resend.dev")
+# Overridable so a stub server can stand in for Resend
+RESEND_API_URL = os.getenv("RESEND_API_URL", "https://api.resend.com")
+# Keep-alive connections held open to the Resend API
+EMAIL_POOL_SIZE = int(os.getenv("EMAIL_POOL_SIZE", str(min(5, os.cpu_count() or 1))))
+
+RESEND_HEADERS = {"Authorization": f"Bearer {RESEND_API_KEY}"}
 
 
 def send_email(to: str, subject: str, html: str, text: Optional[str] = None) -> bool:
@@ -13,27 +22,82 @@ def send_email(to: str, subject: str, html: str, text: Optional[str] = None) ->
     return _mock_send(to, subject, html, text)
 
 
+def _resend_params(to: str, subject: str, html: str, text: Optional[str] = None) -> dict:
+    """Build the Resend payload for one email."""
+    params = {
+        "from": FROM_EMAIL,
+        "to": [to],
+        "subject": subject,
+        "html": html,
+    }
+
+    if text:
+        params["text"] = text
+
+    return params
+
+
 def _send_via_resend(to: str, subject: str, html: str, text: Optional[str] = None) -> bool:
-    """Send email using the Resend API."""
+    """Send email using the Resend API, blocking until it is accepted.
+
+    Only used before the email queue starts, so there is no pool to reuse.
+    """
     try:
-        import resend
-        resend.api_key = RESEND_API_KEY
+        response = httpx.post(
+            f"{RESEND_API_URL}/emails",
+            headers=RESEND_HEADERS,
+            json=_resend_params(to, subject, html, text),
+            timeout=30,
+        )
+        response.raise_for_status()
+        print(f"[Resend] Email sent to {to} (ID: {response.json()['id']})")
+        return True
+    except Exception as e:
+        print(f"[Resend] Error sending email to {to}: {e}")
+        return False
 
-        params: resend.Emails.SendParams = {
-            "from": FROM_EMAIL,
-            "to": [to],
-            "subject": subject,
-            "html": html,
-        }
 
-        if text:
-            params["text"] = text
+def _is_retryable(error: Exception) -> bool:
+    """Whether a failed Resend request might succeed if sent again later.
 
-        response = resend.Emails.send(params)
-        print(f"[Resend] Email sent to {to} (ID: {response['id']})")
+    Network errors, rate limiting and server errors are worth retrying; any
+    other 4xx means Resend rejected the email itself.
+    """
+    if isinstance(error, httpx.TransportError):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status == 429 or status >= 500
+    return False
+
+
+async def _send_via_resend_async(
+    client: httpx.AsyncClient, to: str, subject: str, html: str, text: Optional[str] = None
+) -> Optional[bool]:
+    """Send email using the Resend API without blocking the event loop.
+
+    Returns True once sent, None if the request failed in a way worth
+    retrying, and False if Resend rejected the email.
+    """
+    try:
+        response = await client.post("/emails", json=_resend_params(to, subject, html, text))
+        response.raise_for_status()
+        print(f"[Resend] Email sent to {to} (ID: {response.json()['id']})")
         return True
     except Exception as e:
         print(f"[Resend] Error sending email to {to}: {e}")
+        return None if _is_retryable(e) else False
+
+
+async def _send_batch_via_resend_async(client: httpx.AsyncClient, emails: list) -> bool:
+    """Send several emails in one Resend batch request. Takes (to, subject, html, text) tuples."""
+    try:
+        response = await client.post("/emails/batch", json=[_resend_params(*email) for email in emails])
+        response.raise_for_status()
+        print(f"[Resend] Batch of {len(emails)} emails sent")
+        return True
+    except Exception as e:
+        print(f"[Resend] Error sending batch of {len(emails)} emails: {e}")
         return False
 
 
@@ -46,3 +110,112 @@ def _mock_send(to: str, subject: str, html: str, text: Optional[str] = None) ->
     print(f"  Body:    {text or html}")
     print(f"{'='*60}\n")
     return True
+
+
+class EmailQueue:
+    """Delivers emails from a background task so requests don't wait on the provider.
+
+    Emails queued close together are sent in one batch request over an async
+    HTTP client. If the batch fails, each email is sent on its own so one bad
+    address can't hold back the rest, and emails that failed for transient
+    reasons are retried with exponential backoff. Until
+    start() is called from a running event loop, enqueue() falls back to
+    sending inline.
+    """
+
+    # Emails arriving within this window go out in one batch request
+    BATCH_WINDOW = 0.05  # seconds
+    BATCH_MAX = 100  # Resend's limit per batch request
+
+    def __init__(self, max_attempts: int = 5, base_delay: float = 2.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def start(self) -> None:
+        """Start the background worker on the running event loop."""
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        if RESEND_API_KEY:
+            self._client = httpx.AsyncClient(
+                base_url=RESEND_API_URL,
+                headers=RESEND_HEADERS,
+                limits=httpx.Limits(max_connections=EMAIL_POOL_SIZE, max_keepalive_connections=EMAIL_POOL_SIZE),
+                timeout=30,
+            )
+        self._worker = self._loop.create_task(self._run())
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Give queued emails a chance to go out, then stop the worker."""
+        if not self._worker:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            print(f"[Email] Stopping with {self._queue.qsize()} unsent email(s)")
+        self._worker.cancel()
+        self._worker = None
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+
+    def enqueue(self, to: str, subject: str, html: str, text: Optional[str] = None) -> bool:
+        """Queue an email for delivery. Safe to call from any thread."""
+        if not self._worker:
+            return send_email(to, subject, html, text)
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, (to, subject, html, text, 1))
+        return True
+
+    async def _next_batch(self) -> list:
+        """Wait for an email, then gather more until the batch fills or the window closes."""
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.BATCH_WINDOW
+        while len(batch) < self.BATCH_MAX:
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _send(self, batch: list) -> list:
+        """Send a batch of queued emails, in one request when there are several.
+
+        Returns one result per email, as from _send_via_resend_async.
+        """
+        emails = [item[:4] for item in batch]
+        if not self._client:
+            return [_mock_send(*email) for email in emails]
+        if len(emails) > 1 and await _send_batch_via_resend_async(self._client, emails):
+            return [True] * len(emails)
+        return await asyncio.gather(*[_send_via_resend_async(self._client, *email) for email in emails])
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            try:
+                results = await self._send(batch)
+            except Exception as e:
+                print(f"[Email] Error sending {len(batch)} email(s): {e}")
+                results = [None] * len(batch)
+
+            for (to, subject, html, text, attempt), sent in zip(batch, results):
+                if sent is False:
+                    print(f"[Email] Email to {to} was rejected, not retrying")
+                elif sent is None:
+                    if attempt < self.max_attempts:
+                        delay = self.base_delay * 2 ** (attempt - 1)
+                        print(f"[Email] Retrying email to {to} in {delay:.0f}s (attempt {attempt + 1}/{self.max_attempts})")
+                        self._loop.call_later(delay, self._queue.put_nowait, (to, subject, html, text, attempt + 1))
+                    else:
+                        print(f"[Email] Giving up on email to {to} after {attempt} attempts")
+                self._queue.task_done()
+
+
+# Global queue instance, started by the API lifespan
+email_queue = EmailQueue()
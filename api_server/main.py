@@ -1,8 +1,13 @@
+import asyncio
 import os
+import time
 from typing import Optional, List, Union
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException, Depends
+from functools import cached_property
+import orjson
+from fastapi import FastAPI, HTTPException, Depends, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -10,15 +15,49 @@ load_dotenv()  # From CWD
 # Also look in root directory if we are inside api_server/
 load_dotenv(os.path.join(os.path.dirname(__file__), "..", ".env"))
 
-from api_server.database import init_db
-from api_server.auth import register_user, verify_magic_link, create_access_token, get_current_user, register_with_password, login_with_password
+from api_server.database import init_db, purge_magic_links
+from api_server.email_provider import email_queue
+from api_server.services.extractor import extractor_service
+from api_server.services.job_batcher import job_batcher
+from api_server.auth import register_user, verify_magic_link, create_access_token, get_current_user, register_with_password, login_with_password, check_bcrypt_cost, BCRYPT_MAX_PASSWORD_BYTES
 from api_server.routes import jobs, results, keys, categories, payments
 
+MAGIC_LINK_PURGE_INTERVAL = 3600  # seconds
+
+
+async def purge_magic_links_periodically():
+    """Remove used and expired magic links once an hour."""
+    while True:
+        try:
+            removed = await asyncio.to_thread(purge_magic_links)
+            if removed:
+                print(f"[Auth] Purged {removed} used or expired magic links")
+        except Exception as e:
+            print(f"[Auth] Magic link purge failed: {e}")
+        await asyncio.sleep(MAGIC_LINK_PURGE_INTERVAL)
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson instead of the stdlib encoder."""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
+
+
 # Initialize database on startup
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     init_db()
+    check_bcrypt_cost()
+    email_queue.start()
+    job_batcher.start()
+    extractor_service.start()
+    purge_task = asyncio.create_task(purge_magic_links_periodically())
     yield
+    purge_task.cancel()
+    await job_batcher.stop()
+    await asyncio.to_thread(extractor_service.close)
+    await email_queue.stop()
 
 
 # Create FastAPI app
@@ -27,6 +66,7 @@ app = FastAPI(
     description="Multi-user lead extraction service using Google Maps API",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # Configure CORS
@@ -37,20 +77,27 @@ dev_origins = [
     "http://127.0.0.1:5173",
 ]
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:4321")
-CORS_ORIGINS = list(set(dev_origins + [FRONTEND_URL]))
+# Deduplicate while keeping a stable order across workers
+CORS_ORIGINS = list(dict.fromkeys(dev_origins + [FRONTEND_URL]))
 
 app.add_middleware(
     CORSMiddleware,
     allow_origins=CORS_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "DELETE"],
+    allow_headers=["Content-Type", "Authorization"],
+    # Let browsers reuse a preflight for a day instead of sending one per request
+    max_age=86400,
 )
 
 # Cookie settings
 COOKIE_NAME = "access_token"
 COOKIE_MAX_AGE = 60 * 60 * 24  # 24 hours in seconds
 
+# Only the token varies between logins, so the Set-Cookie headers are built once
+_AUTH_COOKIE_TEMPLATE = f"{COOKIE_NAME}={{}}; HttpOnly; Max-Age={COOKIE_MAX_AGE}; Path=/; SameSite=lax"
+_LOGGED_IN_COOKIE = f"is_logged_in=true; Max-Age={COOKIE_MAX_AGE}; Path=/; SameSite=lax".encode("latin-1")
+
 # Include routers
 app.include_router(jobs.router)
 app.include_router(results.router)
@@ -72,18 +119,42 @@ class PasswordLoginRequest(BaseModel):
     email: str
     password: str
 
+    @cached_property
+    def password_bytes(self) -> bytes:
+        """The password as UTF-8, encoded once for the length check and bcrypt."""
+        return self.password.encode("utf-8")
 
-class PasswordRegisterRequest(BaseModel):
-    email: str
-    password: str
+
+class PasswordRegisterRequest(PasswordLoginRequest):
+    pass
 
 
 class TokenRequest(BaseModel):
     token: str
 
 
+def _session_response(user: dict, read_at: float) -> ORJSONResponse:
+    """Issue an access token for the user and return it with the session cookies set.
+
+    user is the users row, read no earlier than read_at; only its id and
+    email are sent back.
+    """
+    token_data = create_access_token(user, read_at)
+
+    response = ORJSONResponse(content={
+        "access_token": token_data["access_token"],
+        "token_type": token_data["token_type"],
+        "user": {"id": user["id"], "email": user["email"]},
+    })
+    response.raw_headers.append(
+        (b"set-cookie", _AUTH_COOKIE_TEMPLATE.format(token_data["access_token"]).encode("latin-1"))
+    )
+    response.raw_headers.append((b"set-cookie", _LOGGED_IN_COOKIE))
+    return response
+
+
 @app.post("/api/auth/register")
-async def register(request: EmailRequest):
+def register(request: EmailRequest):
     """Register a new user and send magic link."""
     if not request.email or "@" not in request.email:
         raise HTTPException(status_code=400, detail="error.validation.invalid_email")
@@ -97,9 +168,9 @@ async def register(request: EmailRequest):
 
 
 @app.post("/api/auth/login")
-async def login(request: EmailRequest):
+def login(request: EmailRequest):
     """Request magic link for login."""
-    return await register(request)
+    return register(request)
 
 
 @app.post("/api/auth/register/password")
@@ -111,42 +182,16 @@ async def register_password(request: PasswordRegisterRequest):
     if not request.password or len(request.password) < 8:
         raise HTTPException(status_code=400, detail="error.validation.password_too_short")
 
-    if len(request.password.encode("utf-8")) > 72:
+    if len(request.password_bytes) > BCRYPT_MAX_PASSWORD_BYTES:
         raise HTTPException(status_code=400, detail="error.validation.password_too_long")
 
-    success, message, user = register_with_password(request.email, request.password)
+    read_at = time.time()
+    success, message, user = await register_with_password(request.email, request.password_bytes)
 
     if not success:
         raise HTTPException(status_code=400, detail=message)
 
-    token_data = create_access_token(user["id"], user["email"])
-
-    response = {
-        "access_token": token_data["access_token"],
-        "token_type": token_data["token_type"],
-        "user": user,
-    }
-
-    # Return response with cookies set
-    from fastapi.responses import JSONResponse
-    response_obj = JSONResponse(content=response)
-    response_obj.set_cookie(
-        key=COOKIE_NAME,
-        value=token_data["access_token"],
-        httponly=True,
-        path="/",
-        max_age=COOKIE_MAX_AGE,
-        samesite="lax",
-    )
-    response_obj.set_cookie(
-        key="is_logged_in",
-        value="true",
-        httponly=False,
-        path="/",
-        max_age=COOKIE_MAX_AGE,
-        samesite="lax",
-    )
-    return response_obj
+    return _session_response(user, read_at)
 
 
 @app.post("/api/auth/login/password")
@@ -155,80 +200,28 @@ async def login_password(request: PasswordLoginRequest):
     if not request.email or not request.password:
         raise HTTPException(status_code=400, detail="error.validation.email_password_required")
 
-    if len(request.password.encode("utf-8")) > 72:
+    if len(request.password_bytes) > BCRYPT_MAX_PASSWORD_BYTES:
         raise HTTPException(status_code=400, detail="error.validation.password_too_long")
 
-    success, message, user = login_with_password(request.email, request.password)
+    read_at = time.time()
+    success, message, user = await login_with_password(request.email, request.password_bytes)
 
     if not success:
         raise HTTPException(status_code=401, detail=message)
 
-    token_data = create_access_token(user["id"], user["email"])
-
-    response = {
-        "access_token": token_data["access_token"],
-        "token_type": token_data["token_type"],
-        "user": user,
-    }
-
-    # Return response with cookies set
-    from fastapi.responses import JSONResponse
-    response_obj = JSONResponse(content=response)
-    response_obj.set_cookie(
-        key=COOKIE_NAME,
-        value=token_data["access_token"],
-        httponly=True,
-        path="/",
-        max_age=COOKIE_MAX_AGE,
-        samesite="lax",
-    )
-    response_obj.set_cookie(
-        key="is_logged_in",
-        value="true",
-        httponly=False,
-        path="/",
-        max_age=COOKIE_MAX_AGE,
-        samesite="lax",
-    )
-    return response_obj
+    return _session_response(user, read_at)
 
 
 @app.post("/api/auth/verify")
-async def verify(request: TokenRequest):
+def verify(request: TokenRequest):
     """Verify magic link and return access token."""
+    read_at = time.time()
     user = verify_magic_link(request.token)
 
     if not user:
         raise HTTPException(status_code=400, detail="error.auth.invalid_magic_link")
 
-    token_data = create_access_token(user["id"], user["email"])
-
-    response = {
-        "access_token": token_data["access_token"],
-        "token_type": token_data["token_type"],
-        "user": user,
-    }
-
-    # Return response with cookies set
-    from fastapi.responses import JSONResponse
-    response_obj = JSONResponse(content=response)
-    response_obj.set_cookie(
-        key=COOKIE_NAME,
-        value=token_data["access_token"],
-        httponly=True,
-        path="/",
-        max_age=COOKIE_MAX_AGE,
-        samesite="lax",
-    )
-    response_obj.set_cookie(
-        key="is_logged_in",
-        value="true",
-        httponly=False,
-        path="/",
-        max_age=COOKIE_MAX_AGE,
-        samesite="lax",
-    )
-    return response_obj
+    return _session_response(user, read_at)
 
 
 @app.get("/api/auth/me")
@@ -239,18 +232,17 @@ async def get_me(user=Depends(get_current_user)):
     return user
 
 
-@app.post("/api/auth/logout")
+@app.post("/api/auth/logout", status_code=204, response_class=Response)
 async def logout():
     """Logout user by clearing cookies."""
-    from fastapi.responses import JSONResponse
-    response = JSONResponse(content={"message": "Logged out successfully"})
+    response = Response(status_code=204)
     response.delete_cookie(key=COOKIE_NAME, path="/")
     response.delete_cookie(key="is_logged_in", path="/")
     return response
 
 
 # Health check
-@app.get("/health")
+@app.get("/health", status_code=204, response_class=Response)
 async def health_check():
     """Health check endpoint."""
-    return {"status": "healthy"}
+    return Response(status_code=204)
@@ -1,21 +1,24 @@
 # routes/jobs.py - Job management endpoints
-from typing import Optional, List
+from typing import Literal, Optional, List
 from fastapi import APIRouter, HTTPException, Depends, Query, Body
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from api_server.auth import get_current_user
 from api_server.database import (
-    create_job,
+    has_active_subscription,
     get_job,
     get_jobs,
+    count_jobs,
     delete_job,
+    requeue_job,
 )
 from api_server.services.extractor import extractor_service
+from api_server.services.job_batcher import job_batcher
 
 router = APIRouter(prefix="/api/jobs", tags=["jobs"])
 
 
-def require_auth(user=Depends(get_current_user)) -> dict:
+async def require_auth(user=Depends(get_current_user)) -> dict:
     """Require authentication."""
     if not user:
         raise HTTPException(status_code=401, detail="error.auth.not_authenticated")
@@ -24,19 +27,19 @@ def require_auth(user=Depends(get_current_user)) -> dict:
 
 class CreateJobRequest(BaseModel):
     name: str
-    center_lat: float
-    center_lng: float
+    center_lat: float = Field(ge=-90, le=90)
+    center_lng: float = Field(ge=-180, le=180)
     center_address: Optional[str] = None
     categories: Optional[List[str]] = None
-    radius: int = 5000
+    radius: int = Field(5000, ge=1, le=50000)  # Places API maximum
     require_no_website: bool = False
     require_no_social: bool = False
     require_phone: bool = False
     require_address: bool = False
-    min_rating: Optional[float] = None
-    min_reviews: Optional[int] = None
-    min_photos: Optional[int] = None
-    sort_by: str = "score"
+    min_rating: Optional[float] = Field(None, ge=0, le=5)
+    min_reviews: Optional[int] = Field(None, ge=0)
+    min_photos: Optional[int] = Field(None, ge=0)
+    sort_by: Literal["score", "distance"] = "score"
 
 
 @router.post("", status_code=201)
@@ -45,33 +48,15 @@ async def create_new_job(
     user: dict = Depends(require_auth),
 ):
     # --- Subscription and Credit Logic ---
-    from datetime import datetime
     
-    tier = user.get("subscription_tier", "free")
-    expires_at_str = user.get("subscription_expires_at")
-    has_active_sub = False
-    
-    if tier in ["week", "month"] and expires_at_str:
-        # Check if subscription is still valid
-        expires_at = datetime.fromisoformat(expires_at_str)
-        if expires_at > datetime.utcnow():
-            has_active_sub = True
-
-    credit_deducted = False
-    if not has_active_sub:
-        credits = user.get("job_credits", 0)
-        if credits > 0:
-            from api_server.database import use_job_credit
-            # Attempt to consume a credit.
-            credit_used = use_job_credit(user["id"])
-            if not credit_used:
-                raise HTTPException(status_code=402, detail="error.payment.insufficient_credits")
-            credit_deducted = True
-        else:
-            raise HTTPException(status_code=402, detail="error.payment.payment_required")
+    # Without an active plan the job costs a credit, which the insert itself
+    # deducts so the two can't get out of step
+    needs_credit = not has_active_subscription(user)
+    if needs_credit and user.get("job_credits", 0) <= 0:
+        raise HTTPException(status_code=402, detail="error.payment.payment_required")
 
     # --- Proceed with Job Creation ---
-    job_id = create_job(
+    job_id = await job_batcher.submit(
         user_id=user["id"],
         name=request.name,
         center_lat=request.center_lat,
@@ -87,11 +72,11 @@ async def create_new_job(
         min_reviews=request.min_reviews,
         min_photos=request.min_photos,
         sort_by=request.sort_by,
-        deducted_credit=credit_deducted,
+        deducted_credit=needs_credit,
     )
 
-    # Start the job in background
-    extractor_service.run_job(job_id, user["id"])
+    if job_id is None:
+        raise HTTPException(status_code=402, detail="error.payment.insufficient_credits")
 
     return {
         "id": job_id,
@@ -102,20 +87,25 @@ async def create_new_job(
 
 
 @router.get("")
-async def list_jobs(
+def list_jobs(
     limit: int = Query(50, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    cursor: Optional[int] = Query(None, ge=1),
     user: dict = Depends(require_auth),
 ):
-    """List all jobs for the current user."""
-    from api_server.database import count_jobs
-    jobs = get_jobs(user["id"], limit=limit, offset=offset)
+    """List all jobs for the current user.
+
+    Pages by offset, or by cursor when one is given; pass the previous
+    response's next_cursor to fetch the following page.
+    """
+    jobs = get_jobs(user["id"], limit=limit, offset=offset, before_id=cursor)
     total = count_jobs(user["id"])
-    return {"jobs": jobs, "total": total}
+    next_cursor = jobs[-1]["id"] if len(jobs) == limit else None
+    return {"jobs": jobs, "total": total, "next_cursor": next_cursor}
 
 
 @router.get("/{job_id}")
-async def get_job_details(
+def get_job_details(
     job_id: int,
     user: dict = Depends(require_auth),
 ):
@@ -129,31 +119,25 @@ async def get_job_details(
 
 
 @router.delete("/{job_id}")
-async def remove_job(
+def remove_job(
     job_id: int,
     user: dict = Depends(require_auth),
 ):
     """Delete a job."""
-    job = get_job(job_id, user["id"])
+    job = delete_job(job_id, user["id"])
 
     if not job:
         raise HTTPException(status_code=404, detail="error.job.not_found")
 
-    # Cancel if running
+    # Stop it if it was still running
     if job["status"] == "running":
-        extractor_service.cancel_job(job_id)
-
-    # Delete
-    success = delete_job(job_id, user["id"])
-
-    if not success:
-        raise HTTPException(status_code=500, detail="error.job.delete_failed")
+        extractor_service.cancel_job(job_id, job)
 
     return {"message": "Job deleted successfully"}
 
 
 @router.post("/{job_id}/cancel")
-async def cancel_job(
+def cancel_job(
     job_id: int,
     user: dict = Depends(require_auth),
 ):
@@ -166,7 +150,7 @@ async def cancel_job(
     if job["status"] != "running":
         raise HTTPException(status_code=400, detail="error.job.not_running")
 
-    success = extractor_service.cancel_job(job_id)
+    success = extractor_service.cancel_job(job_id, job)
 
     if not success:
         raise HTTPException(status_code=500, detail="error.job.cancel_failed")
@@ -175,23 +159,17 @@ async def cancel_job(
 
 
 @router.post("/{job_id}/restart")
-async def restart_job(
+def restart_job(
     job_id: int,
     user: dict = Depends(require_auth),
 ):
     """Restart a failed or cancelled job."""
-    job = get_job(job_id, user["id"])
-
-    if not job:
-        raise HTTPException(status_code=404, detail="error.job.not_found")
-
-    if job["status"] not in ["failed", "cancelled"]:
+    if not requeue_job(job_id, user["id"]):
+        # Only look the job up again to tell the two failure cases apart
+        if not get_job(job_id, user["id"]):
+            raise HTTPException(status_code=404, detail="error.job.not_found")
         raise HTTPException(status_code=400, detail="error.job.cannot_restart")
 
-    # Update status to queued
-    from api_server.database import update_job_status
-    update_job_status(job_id, "queued")
-
     # Start the job
     extractor_service.run_job(job_id, user["id"])
 
@@ -12,7 +12,7 @@ from api_server.database import (
 router = APIRouter(prefix="/api/keys", tags=["keys"])
 
 
-def require_auth(user=Depends(get_current_user)) -> dict:
+async def require_auth(user=Depends(get_current_user)) -> dict:
     """Require authentication."""
     if not user:
         raise HTTPException(status_code=401, detail="error.auth.not_authenticated")
@@ -25,17 +25,13 @@ class AddKeyRequest(BaseModel):
 
 
 @router.get("")
-async def list_keys(user: dict = Depends(require_auth)):
+def list_keys(user: dict = Depends(require_auth)):
     """List all API keys for the current user."""
-    keys = get_api_keys(user["id"])
-    # Mask the API key (show only last 4 characters)
-    for key in keys:
-        key["key_preview"] = "****"
-    return {"keys": keys}
+    return {"keys": get_api_keys(user["id"])}
 
 
 @router.post("", status_code=201)
-async def add_key(
+def add_key(
     request: AddKeyRequest,
     user: dict = Depends(require_auth),
 ):
@@ -53,7 +49,7 @@ async def add_key(
 
 
 @router.delete("/{key_id}")
-async def remove_key(
+def remove_key(
     key_id: int,
     user: dict = Depends(require_auth),
 ):
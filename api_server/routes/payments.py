@@ -1,9 +1,10 @@
 import os
 import stripe
 from fastapi import APIRouter, Header, HTTPException, Request, Depends
+from fastapi.concurrency import run_in_threadpool
 from typing import Dict, Any
 from ..auth import get_current_user
-from ..database import update_user_subscription
+from ..database import fulfill_stripe_event
 
 # Initialize Stripe
 stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
@@ -20,15 +21,42 @@ PRICE_USD_SINGLE = 400    # $4.00 USD in cents
 PRICE_USD_WEEK = 1000     # $10.00 USD in cents
 PRICE_USD_MONTH = 2000    # $20.00 USD in cents
 
+PRODUCT_NAMES = {
+    "single": "1 Job (Lead Extraction)",
+    "week": "1 Week Unlimited Access",
+    "month": "1 Month Unlimited Access",
+}
+
+# (currency, tier) -> (unit amount in cents, product name)
+PRICING = {
+    ("mxn", "single"): (PRICE_MXN_SINGLE, PRODUCT_NAMES["single"]),
+    ("mxn", "week"): (PRICE_MXN_WEEK, PRODUCT_NAMES["week"]),
+    ("mxn", "month"): (PRICE_MXN_MONTH, PRODUCT_NAMES["month"]),
+    ("usd", "single"): (PRICE_USD_SINGLE, PRODUCT_NAMES["single"]),
+    ("usd", "week"): (PRICE_USD_WEEK, PRODUCT_NAMES["week"]),
+    ("usd", "month"): (PRICE_USD_MONTH, PRODUCT_NAMES["month"]),
+}
+
+# Optional pre-created Stripe Price IDs, e.g. STRIPE_PRICE_MXN_WEEK=price_...
+# Checkout references a configured price directly and falls back to inline
+# price_data for any (currency, tier) without one.
+PRICE_IDS = {
+    key: price_id
+    for key in PRICING
+    if (price_id := os.getenv(f"STRIPE_PRICE_{key[0].upper()}_{key[1].upper()}"))
+}
+
 router = APIRouter()
 
+# Standard CDN geolocation headers, in order of preference
+COUNTRY_HEADERS = ("CF-IPCountry", "X-Vercel-IP-Country", "CloudFront-Viewer-Country")
+
+
 def get_currency_from_request(request: Request) -> str:
     """Determine currency based on IP geolocation headers."""
-    # Standard CDN headers
-    country = request.headers.get("CF-IPCountry") or \
-              request.headers.get("X-Vercel-IP-Country") or \
-              request.headers.get("CloudFront-Viewer-Country")
-    
+    headers = request.headers
+    country = next(filter(None, map(headers.get, COUNTRY_HEADERS)), None)
+
     if not country:
         # Fallback to local dev or missing headers
         # For a robust implementation, you could call an external API here,
@@ -42,6 +70,25 @@ def get_currency_from_request(request: Request) -> str:
     return "mxn" if country.upper() == "MX" else "usd"
 
 
+def _line_item(currency: str, tier: str) -> dict:
+    """Checkout line item for a tier, using its Stripe Price when one is configured."""
+    price_id = PRICE_IDS.get((currency, tier))
+    if price_id:
+        return {'price': price_id, 'quantity': 1}
+
+    unit_amount, product_name = PRICING[(currency, tier)]
+    return {
+        'price_data': {
+            'currency': currency,
+            'product_data': {
+                'name': product_name,
+            },
+            'unit_amount': unit_amount,
+        },
+        'quantity': 1,
+    }
+
+
 @router.post("/api/payments/checkout")
 async def create_checkout_session(request: Request, data: Dict[str, Any], user=Depends(get_current_user)):
     """Create a Stripe Checkout Session."""
@@ -50,49 +97,17 @@ async def create_checkout_session(request: Request, data: Dict[str, Any], user=D
         raise HTTPException(status_code=400, detail="error.payment.invalid_tier")
 
     currency = get_currency_from_request(request)
-    
-    # Determine price and details based on tier and currency
-    if currency == "mxn":
-        if tier == "single":
-            unit_amount = PRICE_MXN_SINGLE
-            product_name = "1 Job (Lead Extraction)"
-        elif tier == "week":
-            unit_amount = PRICE_MXN_WEEK
-            product_name = "1 Week Unlimited Access"
-        else:
-            unit_amount = PRICE_MXN_MONTH
-            product_name = "1 Month Unlimited Access"
-    else:
-        if tier == "single":
-            unit_amount = PRICE_USD_SINGLE
-            product_name = "1 Job (Lead Extraction)"
-        elif tier == "week":
-            unit_amount = PRICE_USD_WEEK
-            product_name = "1 Week Unlimited Access"
-        else:
-            unit_amount = PRICE_USD_MONTH
-            product_name = "1 Month Unlimited Access"
 
     # Assume frontend is at same origin as backend if not configured
     frontend_url = os.getenv("FRONTEND_URL", "http://localhost:4321")
 
     try:
-        # Create a new Checkout Session
-        checkout_session = stripe.checkout.Session.create(
+        # Create a new Checkout Session (a blocking HTTP call to Stripe)
+        checkout_session = await run_in_threadpool(
+            stripe.checkout.Session.create,
             payment_method_types=['card'],
             customer_email=user["email"], # Pre-fill email
-            line_items=[
-                {
-                    'price_data': {
-                        'currency': currency,
-                        'product_data': {
-                            'name': product_name,
-                        },
-                        'unit_amount': unit_amount,
-                    },
-                    'quantity': 1,
-                },
-            ],
+            line_items=[_line_item(currency, tier)],
             mode='payment',
             success_url=f"{frontend_url}/payment/success?session_id={{CHECKOUT_SESSION_ID}}",
             cancel_url=f"{frontend_url}/checkout?canceled=true",
@@ -138,13 +153,22 @@ async def stripe_webhook(request: Request):
             try:
                 user_id_str, tier = client_reference_id.split('_')
                 user_id = int(user_id_str)
-                
-                print(f"Fulfilling payment for User {user_id}, Tier: {tier}")
-                from ..database import update_user_subscription
-                success = update_user_subscription(user_id, tier)
-                print(f"Database update success: {success}")
+            except ValueError:
+                # Redelivering can't fix a malformed reference, so acknowledge it
+                print(f"Error: Malformed client_reference_id: {client_reference_id}")
+                return {"status": "success"}
+
+            print(f"Fulfilling payment for User {user_id}, Tier: {tier}")
+            try:
+                success = await run_in_threadpool(fulfill_stripe_event, event['id'], user_id, tier)
             except Exception as e:
+                # The event wasn't recorded either, so a 5xx makes Stripe retry it
                 print(f"Error in fulfillment logic: {str(e)}")
+                raise HTTPException(status_code=500, detail="Fulfillment failed")
+            if success is None:
+                print(f"Event {event['id']} already processed, skipping")
+                return {"status": "duplicate"}
+            print(f"Database update success: {success}")
         else:
             print("Warning: No client_reference_id found in session")
 
@@ -1,17 +1,36 @@
 # routes/results.py - Results endpoints
 import io
 import csv
-import json
+import orjson
 from fastapi import APIRouter, HTTPException, Depends, Query
 from fastapi.responses import StreamingResponse
 
 from api_server.auth import get_current_user
-from api_server.database import get_job, get_result
+from api_server.database import get_job, get_results_page, count_results
 
 router = APIRouter(prefix="/api", tags=["results"])
 
 
-def require_auth(user=Depends(get_current_user)) -> dict:
+# Columns in the CSV export, and how many rows are serialized per streamed chunk
+EXPORT_FIELDNAMES = [
+    "name",
+    "business_type",
+    "address",
+    "phone",
+    "rating",
+    "review_count",
+    "price_level",
+    "photos_count",
+    "distance_km",
+    "distance_miles",
+    "website",
+    "maps_url",
+    "lead_score",
+]
+EXPORT_CHUNK_ROWS = 500
+
+
+async def require_auth(user=Depends(get_current_user)) -> dict:
     """Require authentication."""
     if not user:
         raise HTTPException(status_code=401, detail="error.auth.not_authenticated")
@@ -19,7 +38,7 @@ def require_auth(user=Depends(get_current_user)) -> dict:
 
 
 @router.get("/jobs/{job_id}/results")
-async def get_job_results(
+def get_job_results(
     job_id: int,
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
@@ -34,25 +53,17 @@ async def get_job_results(
     if job["status"] != "completed":
         raise HTTPException(status_code=400, detail="error.job.not_completed")
 
-    results = get_result(job_id)
-
-    if results is None:
-        results = []
-
-    # Apply pagination
-    paginated_results = results[offset : offset + limit]
-
     return {
         "job_id": job_id,
-        "total": len(results),
+        "total": count_results(job_id, job["completed_at"]),
         "limit": limit,
         "offset": offset,
-        "results": paginated_results,
+        "results": get_results_page(job_id, limit, offset),
     }
 
 
 @router.get("/jobs/{job_id}/results/export")
-async def export_results(
+def export_results(
     job_id: int,
     format: str = Query("csv", pattern="^(csv|json)$"),
     user: dict = Depends(require_auth),
@@ -66,50 +77,60 @@ async def export_results(
     if job["status"] != "completed":
         raise HTTPException(status_code=400, detail="error.job.not_completed")
 
-    results = get_result(job_id)
-
-    if not results:
+    if not count_results(job_id, job["completed_at"]):
         raise HTTPException(status_code=404, detail="error.job.no_results")
 
     filename = f"leads_{job_id}"
 
     if format == "csv":
-        # Create CSV
-        output = io.StringIO()
-        if results:
-            fieldnames = [
-                "name",
-                "business_type",
-                "address",
-                "phone",
-                "rating",
-                "review_count",
-                "price_level",
-                "photos_count",
-                "distance_km",
-                "distance_miles",
-                "website",
-                "maps_url",
-                "lead_score",
-            ]
-            writer = csv.DictWriter(output, fieldnames=fieldnames)
-            writer.writeheader()
-
-            for row in results:
-                filtered = {k: row.get(k, "") for k in fieldnames}
-                writer.writerow(filtered)
-
-        output.seek(0)
         return StreamingResponse(
-            io.BytesIO(output.getvalue().encode()),
+            _csv_chunks(job_id),
             media_type="text/csv",
             headers={"Content-Disposition": f"attachment; filename={filename}.csv"},
         )
 
     elif format == "json":
-        # Create JSON
         return StreamingResponse(
-            io.BytesIO(json.dumps(results, indent=2).encode()),
+            _json_chunks(job_id),
             media_type="application/json",
             headers={"Content-Disposition": f"attachment; filename={filename}.json"},
         )
+
+
+def _result_pages(job_id: int):
+    """Yield a job's results a page of EXPORT_CHUNK_ROWS at a time, read as needed."""
+    offset = 0
+    while True:
+        rows = get_results_page(job_id, EXPORT_CHUNK_ROWS, offset)
+        if rows:
+            yield rows
+        if len(rows) < EXPORT_CHUNK_ROWS:
+            return
+        offset += EXPORT_CHUNK_ROWS
+
+
+def _csv_chunks(job_id: int):
+    """Yield the CSV export a chunk of rows at a time."""
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=EXPORT_FIELDNAMES, extrasaction="ignore", restval="")
+    writer.writeheader()
+
+    for rows in _result_pages(job_id):
+        writer.writerows(rows)
+        yield output.getvalue().encode()
+        output.seek(0)
+        output.truncate()
+
+
+def _json_chunks(job_id: int):
+    """Yield the results as an indented JSON array a chunk of rows at a time."""
+    yield b"["
+    empty = True
+    for rows in _result_pages(job_id):
+        body = b",".join(
+            b"\n  " + orjson.dumps(row, option=orjson.OPT_INDENT_2).replace(b"\n", b"\n  ")
+            for row in rows
+        )
+        yield body if empty else b"," + body
+        empty = False
+    yield b"]" if empty else b"\n]"
@@ -1,59 +1,102 @@
 # extractor.py - Background job runner for lead extraction
 import asyncio
+import concurrent.futures
 import os
 import threading
+import time
 from typing import Optional, Callable, Awaitable
-from datetime import datetime
+
+import aiohttp
 
 from lib.google_places import GooglePlacesClient
 from lib.filters import apply_all_filters
-from lib.exporter import export_to_csv, export_to_markdown, export_to_json
 from api_server.database import (
+    has_active_subscription,
+    claim_unfinished_jobs,
+    touch_jobs,
     get_job,
-    get_user_by_id,
     update_job_status,
     create_result,
-    get_active_api_key,
+    get_key_resolution,
 )
 
 GOOGLE_PLACES_API_KEY = os.getenv("GOOGLE_PLACES_API_KEY", "")
 
+# Skip progress writes smaller than this many percentage points...
+PROGRESS_MIN_STEP = 5
+# ...unless this many seconds have passed since the last one
+PROGRESS_MIN_INTERVAL = 2.0
+
+# How often this process refreshes its jobs' updated_at and looks for
+# abandoned ones, and how stale a queued or running job must be before any
+# process may take it over
+JOB_HEARTBEAT_INTERVAL = 30
+JOB_STALE_AFTER = 120
+
 
 class LeadExtractorService:
     """Background service for running lead extraction jobs."""
 
     def __init__(self):
-        self._running_jobs: dict[int, asyncio.Task] = {}
-        self._job_loops: dict[int, asyncio.AbstractEventLoop] = {}
+        self._running_jobs: dict[int, concurrent.futures.Future] = {}
         self._job_cancellations: dict[int, Callable[[], None]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+        # One connection pool to the Places API shared by every job; only
+        # touched from the shared loop
+        self._http: Optional[aiohttp.ClientSession] = None
+        # Last progress written per job, as (monotonic time, percent)
+        self._last_progress: dict[int, tuple[float, int]] = {}
+        self._heartbeat: Optional[concurrent.futures.Future] = None
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        """Get the shared background loop all jobs run on, starting it on first use."""
+        with self._loop_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="extractor", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def _get_http(self) -> aiohttp.ClientSession:
+        """Get the shared HTTP session, creating it on the job loop on first use."""
+        if self._http is None or self._http.closed:
+            self._http = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=100, ttl_dns_cache=300),
+            )
+        return self._http
+
+    def close(self, timeout: float = 5) -> None:
+        """Stop the heartbeat and close the shared HTTP session. Call once at shutdown.
+
+        Left open while jobs are still running, so they aren't cut short and
+        recorded as finished; they are resumed on the next start instead.
+        """
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+        if self._loop is None or self._http is None or self._running_jobs:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._http.close(), self._loop).result(timeout)
+        except Exception as e:
+            print(f"[Extractor] Failed to close HTTP session: {e}")
 
-    def _resolve_api_key(self, user_id: int, job_id: int) -> Optional[str]:
+    def _resolve_api_key(self, user_id: int, job: dict) -> Optional[str]:
         """Resolve the API key to use: user's own key first, then platform key for paid users."""
-        user_key = get_active_api_key(user_id)
-        if user_key:
-            return user_key
-
-        user = get_user_by_id(user_id)
+        user = get_key_resolution(user_id)
         if not user:
             return None
 
-        job = get_job(job_id, user_id)
-        if not job:
-            return None
-
-        tier = user.get("subscription_tier", "free")
-        credits = user.get("job_credits", 0)
-        expires_at_str = user.get("subscription_expires_at")
+        if user["api_key"]:
+            return user["api_key"]
 
-        has_paid_access = False
-        if tier in ["week", "month"] and expires_at_str:
-            expires_at = datetime.fromisoformat(expires_at_str)
-            if expires_at > datetime.utcnow():
-                has_paid_access = True
-        
-        # If user has credits left OR this specific job already consumed a credit
-        if credits > 0 or job.get("deducted_credit"):
-            has_paid_access = True
+        # Paid access is an active plan, credits left, or a credit this job already consumed
+        has_paid_access = (
+            has_active_subscription(user)
+            or user.get("job_credits", 0) > 0
+            or bool(job.get("deducted_credit"))
+        )
 
         if has_paid_access and GOOGLE_PLACES_API_KEY:
             return GOOGLE_PLACES_API_KEY
@@ -66,14 +109,20 @@ class LeadExtractorService:
         user_id: int,
         progress_callback: Optional[Callable[[str, int, int], Awaitable[None]]] = None,
     ):
-        """Run a single job."""
-        job = get_job(job_id, user_id)
+        """Run a single job.
+
+        Every database call goes through a worker thread: all jobs share this
+        loop, so a slow query or a wait for a pooled connection must not stall
+        the others.
+        """
+        job = await asyncio.to_thread(get_job, job_id, user_id)
         if not job:
             return
 
-        api_key = self._resolve_api_key(user_id, job_id)
+        api_key = await asyncio.to_thread(self._resolve_api_key, user_id, job)
         if not api_key:
-            update_job_status(
+            await asyncio.to_thread(
+                update_job_status,
                 job_id,
                 "failed",
                 error_message="No API key available. Add your own Google Maps API key in settings, or purchase a managed plan."
@@ -81,7 +130,7 @@ class LeadExtractorService:
             return
 
         try:
-            update_job_status(job_id, "running", progress=0)
+            await asyncio.to_thread(update_job_status, job_id, "running", progress=0)
 
             # Initialize client
             client = GooglePlacesClient(
@@ -89,6 +138,7 @@ class LeadExtractorService:
                 verbose=False,
                 enable_rate_limit=True,
                 progress_callback=progress_callback,
+                session=self._get_http(),
             )
 
             # Get categories
@@ -103,15 +153,17 @@ class LeadExtractorService:
                 max_parallel=10,
             )
 
-            update_job_status(
+            await asyncio.to_thread(
+                update_job_status,
                 job_id,
                 "running",
                 progress=50,
                 total_businesses=len(businesses),
             )
 
-            # Apply filters
-            leads = apply_all_filters(
+            # Apply filters (CPU-bound, so keep it off the loop other jobs share)
+            leads = await asyncio.to_thread(
+                apply_all_filters,
                 businesses,
                 require_no_website=bool(job.get("require_no_website")),
                 require_no_social=bool(job.get("require_no_social")),
@@ -125,7 +177,8 @@ class LeadExtractorService:
                 center_lng=job["center_lng"],
             )
 
-            update_job_status(
+            await asyncio.to_thread(
+                update_job_status,
                 job_id,
                 "running",
                 progress=80,
@@ -133,21 +186,18 @@ class LeadExtractorService:
             )
 
             # Save results
-            create_result(job_id, leads)
-
-            # Export to files (optional - for file downloads)
-            export_to_csv(leads, f"job_{job_id}")
-            export_to_markdown(leads, f"job_{job_id}", job["center_lat"], job["center_lng"])
-            export_to_json(leads)
+            await asyncio.to_thread(create_result, job_id, leads)
 
             # Mark as completed
-            update_job_status(job_id, "completed", progress=100, leads_found=len(leads))
+            await asyncio.to_thread(update_job_status, job_id, "completed", progress=100, leads_found=len(leads))
 
             # If no leads were found and a credit was deducted, refund it
             if len(leads) == 0 and job.get("deducted_credit"):
                 from api_server.database import refund_job_credit
-                refund_job_credit(user_id)
-                update_job_status(job_id, "completed", error_message="Refunded: No leads found for your criteria.")
+                await asyncio.to_thread(refund_job_credit, user_id)
+                await asyncio.to_thread(
+                    update_job_status, job_id, "completed", error_message="Refunded: No leads found for your criteria."
+                )
 
         except Exception as e:
             # If the task was cancelled, it's already handled in cancel_job
@@ -159,55 +209,95 @@ class LeadExtractorService:
             except:
                 pass
 
-            update_job_status(job_id, "failed", error_message=str(e))
+            await asyncio.to_thread(update_job_status, job_id, "failed", error_message=str(e))
             # Refund if job fails and a credit was deducted
             if job.get("deducted_credit"):
                 from api_server.database import refund_job_credit
-                refund_job_credit(user_id)
+                await asyncio.to_thread(refund_job_credit, user_id)
 
     async def _progress_handler(self, job_id: int, category: str, completed: int, total: int):
-        """Handle progress updates."""
+        """Handle progress updates.
+
+        Writes are coalesced: a new value is only stored once it has moved up
+        by PROGRESS_MIN_STEP or PROGRESS_MIN_INTERVAL has passed, and the last
+        category always is.
+        """
         progress = int((completed / total) * 50) if total > 0 else 0
-        update_job_status(job_id, "running", progress=progress)
+        now = time.monotonic()
+        last_time, last_progress = self._last_progress.get(job_id, (0.0, -1))
+        # Category starts report 0 completed; never move the bar backwards
+        if progress <= last_progress:
+            return
+        if (
+            completed < total
+            and progress - last_progress < PROGRESS_MIN_STEP
+            and now - last_time < PROGRESS_MIN_INTERVAL
+        ):
+            return
+        self._last_progress[job_id] = (now, progress)
+        await asyncio.to_thread(update_job_status, job_id, "running", progress=progress)
 
     def run_job(self, job_id: int, user_id: int):
         """Run a job in the background."""
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-
-        async def run():
-            await self._run_job(
+        future = asyncio.run_coroutine_threadsafe(
+            self._run_job(
                 job_id,
                 user_id,
                 lambda cat, c, t: self._progress_handler(job_id, cat, c, t),
-            )
-
-        task = loop.create_task(run())
-        self._running_jobs[job_id] = task
-        self._job_loops[job_id] = loop
-
-        def done_callback(t):
-            if job_id in self._running_jobs:
-                del self._running_jobs[job_id]
-            if job_id in self._job_loops:
-                del self._job_loops[job_id]
-
-        task.add_done_callback(done_callback)
-
-        # Run the loop in a thread
-        thread = threading.Thread(target=loop.run_forever, daemon=True)
-        thread.start()
-
-    def cancel_job(self, job_id: int) -> bool:
-        """Cancel a running job."""
-        if job_id in self._running_jobs:
-            task = self._running_jobs[job_id]
-            loop = self._job_loops.get(job_id)
-            
-            if loop:
-                loop.call_soon_threadsafe(task.cancel)
-            else:
-                task.cancel() # Fallback
+            ),
+            self._get_loop(),
+        )
+        self._running_jobs[job_id] = future
+        future.add_done_callback(lambda f: self._job_done(job_id))
+
+    def _job_done(self, job_id: int) -> None:
+        """Forget a finished job's bookkeeping."""
+        self._running_jobs.pop(job_id, None)
+        self._last_progress.pop(job_id, None)
+
+    def run_jobs(self, job_ids: list[int], user_ids: list[int]):
+        """Run a batch of jobs in the background."""
+        for job_id, user_id in zip(job_ids, user_ids):
+            self.run_job(job_id, user_id)
+
+    def start(self) -> None:
+        """Start the heartbeat on the shared loop. Call once at startup."""
+        if self._heartbeat is None:
+            self._heartbeat = asyncio.run_coroutine_threadsafe(self._heartbeat_loop(), self._get_loop())
+
+    async def _heartbeat_loop(self) -> None:
+        """Keep this process's jobs fresh and pick up jobs other processes dropped."""
+        while True:
+            try:
+                job_ids = list(self._running_jobs)
+                if job_ids:
+                    await asyncio.to_thread(touch_jobs, job_ids)
+                # Only after our own jobs are fresh, so we never claim them
+                await asyncio.to_thread(self.resume_unfinished_jobs)
+            except Exception as e:
+                print(f"[Extractor] Job heartbeat failed: {e}")
+            await asyncio.sleep(JOB_HEARTBEAT_INTERVAL)
+
+    def resume_unfinished_jobs(self) -> int:
+        """Restart jobs whose process stopped before finishing them.
+
+        Job rows are the durable record of pending work, so nothing is lost
+        when the API restarts mid-job. Jobs still owned by a live process are
+        kept fresh by its heartbeat and left alone; the rest are taken over
+        once they have gone JOB_STALE_AFTER seconds without an update.
+        """
+        jobs = claim_unfinished_jobs(JOB_STALE_AFTER)
+        if jobs:
+            print(f"[Extractor] Resuming {len(jobs)} interrupted job(s)")
+            self.run_jobs([job["id"] for job in jobs], [job["user_id"] for job in jobs])
+        return len(jobs)
+
+    def cancel_job(self, job_id: int, job: Optional[dict] = None) -> bool:
+        """Cancel a running job. Pass the job row if the caller already has it."""
+        future = self._running_jobs.get(job_id)
+        if future:
+            # Cancelling the future cancels the task on the shared loop
+            future.cancel()
 
             # Update status
             update_job_status(job_id, "cancelled")
@@ -216,7 +306,8 @@ class LeadExtractorService:
             # Note: We need to fetch the job here because we might be in a different thread
             # than where the status update happens.
             from api_server.database import get_job, refund_job_credit
-            job = get_job(job_id)
+            if job is None:
+                job = get_job(job_id)
             if job and job.get("deducted_credit"):
                 refund_job_credit(job["user_id"])
                 update_job_status(job_id, "cancelled", error_message="Refunded: Job cancelled by user.")
@@ -0,0 +1,128 @@
+# job_batcher.py - Coalesces job submissions into batched inserts
+import asyncio
+from typing import Optional
+
+from api_server.database import create_jobs
+from api_server.services.extractor import extractor_service
+
+
+class JobBatcher:
+    """Collects job submissions for a few milliseconds and creates them together.
+
+    A burst of submissions (e.g. one job per category) becomes one database
+    transaction and one call into the extractor instead of one of each per job.
+    """
+
+    def __init__(self, max_batch: int = 32, max_wait: float = 0.01):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        # The batch the worker is currently creating, so stop() can fail it
+        self._in_flight: list = []
+
+    def start(self) -> None:
+        """Start the background worker on the running event loop."""
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the worker, failing any submissions still waiting."""
+        if not self._worker:
+            return
+        self._worker.cancel()
+        self._worker = None
+        waiting = [future for _, future in self._in_flight]
+        self._in_flight = []
+        while not self._queue.empty():
+            waiting.append(self._queue.get_nowait()[1])
+        for future in waiting:
+            if not future.done():
+                future.set_exception(RuntimeError("Job batcher stopped"))
+
+    async def submit(self, **job) -> Optional[int]:
+        """Create and start a job. Takes create_job's arguments.
+
+        Returns the job id, or None if the job needed a credit and the user
+        had none left.
+        """
+        if not self._worker:
+            job_ids = await asyncio.to_thread(create_jobs, [job])
+            self._start([job], job_ids)
+            return job_ids[0]
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((job, future))
+        return await future
+
+    async def _next_batch(self) -> list:
+        """Wait for a submission, then gather more until the batch fills or times out."""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    @staticmethod
+    def _start(jobs: list, job_ids: list) -> None:
+        """Hand the jobs that were created over to the extractor.
+
+        The jobs already exist by now, so a failure here is only logged; the
+        extractor's heartbeat picks up queued jobs that never started.
+        """
+        created = [(job_id, job["user_id"]) for job, job_id in zip(jobs, job_ids) if job_id is not None]
+        if not created:
+            return
+        try:
+            extractor_service.run_jobs([job_id for job_id, _ in created], [user_id for _, user_id in created])
+        except Exception as e:
+            print(f"[Jobs] Failed to start {len(created)} jobs: {e}")
+
+    async def _create_one_by_one(self, batch: list) -> None:
+        """Create a failed batch's jobs separately, so one bad job only fails its own submission."""
+        for job, future in batch:
+            try:
+                job_id = (await asyncio.to_thread(create_jobs, [job]))[0]
+            except Exception as e:
+                print(f"[Jobs] Failed to create job for user {job['user_id']}: {e}")
+                if not future.done():
+                    future.set_exception(e)
+                continue
+            self._start([job], [job_id])
+            if not future.done():
+                future.set_result(job_id)
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            self._in_flight = batch
+            jobs = [job for job, _ in batch]
+            try:
+                job_ids = await asyncio.to_thread(create_jobs, jobs)
+            except Exception as e:
+                print(f"[Jobs] Failed to create batch of {len(batch)} jobs: {e}")
+                if len(batch) > 1:
+                    await self._create_one_by_one(batch)
+                else:
+                    _, future = batch[0]
+                    if not future.done():
+                        future.set_exception(e)
+                self._in_flight = []
+                continue
+
+            self._start(jobs, job_ids)
+            for (_, future), job_id in zip(batch, job_ids):
+                if not future.done():
+                    future.set_result(job_id)
+            self._in_flight = []
+
+
+# Global batcher instance, started by the API lifespan
+job_batcher = JobBatcher()
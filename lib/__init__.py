@@ -3,6 +3,7 @@ from lib.config import (
     DEFAULT_RADIUS,
     MAX_RESULTS_PER_CATEGORY,
     VALID_PLACE_TYPES,
+    VALID_PLACE_TYPES_SET,
     DEFAULT_MIN_RATING,
     DEFAULT_MIN_REVIEWS,
     DEFAULT_MIN_PHOTOS,
@@ -23,6 +24,7 @@ __all__ = [
     "DEFAULT_RADIUS",
     "MAX_RESULTS_PER_CATEGORY",
     "VALID_PLACE_TYPES",
+    "VALID_PLACE_TYPES_SET",
     "DEFAULT_MIN_RATING",
     "DEFAULT_MIN_REVIEWS",
     "DEFAULT_MIN_PHOTOS",
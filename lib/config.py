@@ -12,7 +12,7 @@ GOOGLE_MAPS_API_KEY = os.getenv("GOOGLE_MAPS_API_KEY", "")
 # =============================================================================
 # Valid Google Places API Types (for searchNearby)
 # =============================================================================
-VALID_PLACE_TYPES = [
+VALID_PLACE_TYPES = (
     "car_dealer",
     "car_rental",
     "car_repair",
@@ -527,7 +527,10 @@ VALID_PLACE_TYPES = [
     "sublocality_level_5",
     "subpremise",
     "town_square",
-]
+)
+
+# For membership checks on user-supplied categories
+VALID_PLACE_TYPES_SET = frozenset(VALID_PLACE_TYPES)
 
 # =============================================================================
 # Category Groups (user-facing groups for the job form)
@@ -737,6 +740,7 @@ if _other:
 DEFAULT_RADIUS = 5000  # meters (5km)
 MAX_RESULTS_PER_CATEGORY = 5000  # Maximum results per category (set high to get all)
 DEFAULT_USE_QUALITY_FILTERS = False  # Show all businesses, just add compliance info
+SEARCH_CACHE_TTL = int(os.getenv("PLACES_CACHE_TTL", "3600"))  # Seconds a completed search is reused (0 disables)
 
 # =============================================================================
 # Quality Filter Thresholds (must meet ALL to be included)
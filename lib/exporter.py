@@ -1,11 +1,59 @@
 # exporter.py
 import os
+import csv
 import json
-import pandas as pd
+import sys
+from collections import Counter
 from typing import List, Dict
 from datetime import datetime
 from lib.config import LEADS_DIR, OUTPUT_CSV, OUTPUT_MD
 
+# orjson is much faster for large exports; the scripts can run without it
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Business key -> CSV column, in output order
+CSV_COLUMNS = {
+    "name": "name",
+    "business_type": "business_type",
+    "address": "address",
+    "phone": "phone",
+    "rating": "rating",
+    "review_count": "review_count",
+    "price_level_display": "price_level",
+    "photos_count": "photos_count",
+    "distance_km": "distance_km",
+    "distance_miles": "distance_miles",
+    "website": "website",
+    "social": "social",
+    "maps_url": "google_maps_url",
+    "description": "description",
+    "lat": "lat",
+    "lng": "lng",
+    "business_status": "business_status",
+    "lead_score": "lead_score",
+}
+
+# Value for a CSV column whose key is missing from a business
+CSV_DEFAULTS = {
+    key: 0 if key in ("rating", "review_count", "photos_count", "lat", "lng", "lead_score")
+    else None if key in ("distance_km", "distance_miles")
+    else ""
+    for key in CSV_COLUMNS
+}
+
+_leads_dir_ready = False
+
+
+def _ensure_leads_dir():
+    """Create the leads directory, once per process."""
+    global _leads_dir_ready
+    if not _leads_dir_ready:
+        os.makedirs(LEADS_DIR, exist_ok=True)
+        _leads_dir_ready = True
+
 
 def export_to_csv(businesses: List[dict], filename: str = None) -> str:
     """
@@ -22,7 +70,7 @@ def export_to_csv(businesses: List[dict], filename: str = None) -> str:
         return ""
 
     # Create leads directory if it doesn't exist
-    os.makedirs(LEADS_DIR, exist_ok=True)
+    _ensure_leads_dir()
 
     # Determine output path
     if filename:
@@ -34,32 +82,13 @@ def export_to_csv(businesses: List[dict], filename: str = None) -> str:
     else:
         output_file = os.path.join(LEADS_DIR, OUTPUT_CSV)
 
-    # Flatten the data for CSV
-    rows = []
-    for b in businesses:
-        rows.append({
-            "name": b.get("name", ""),
-            "business_type": b.get("business_type", ""),
-            "address": b.get("address", ""),
-            "phone": b.get("phone", ""),
-            "rating": b.get("rating", 0),
-            "review_count": b.get("review_count", 0),
-            "price_level": b.get("price_level_display", ""),
-            "photos_count": b.get("photos_count", 0),
-            "distance_km": b.get("distance_km"),
-            "distance_miles": b.get("distance_miles"),
-            "website": b.get("website", ""),
-            "social": b.get("social", ""),
-            "google_maps_url": b.get("maps_url", ""),
-            "description": b.get("description", ""),
-            "lat": b.get("lat", 0),
-            "lng": b.get("lng", 0),
-            "business_status": b.get("business_status", ""),
-            "lead_score": b.get("lead_score", 0),
-        })
-
-    df = pd.DataFrame(rows)
-    df.to_csv(output_file, index=False)
+    # Stream rows through the C csv writer; a business missing a key gets
+    # that column's default
+    fields = list(CSV_DEFAULTS.items())
+    with open(output_file, "w", newline="", buffering=1 << 20) as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(CSV_COLUMNS.values())
+        writer.writerows([b.get(key, default) for key, default in fields] for b in businesses)
 
     return output_file
 
@@ -81,7 +110,7 @@ def export_to_markdown(businesses: List[dict], filename: str = None, center_lat:
         return ""
 
     # Create leads directory if it doesn't exist
-    os.makedirs(LEADS_DIR, exist_ok=True)
+    _ensure_leads_dir()
 
     # Format center coordinates
     if center_lat is not None and center_lng is not None:
@@ -98,134 +127,137 @@ def export_to_markdown(businesses: List[dict], filename: str = None, center_lat:
     else:
         output_file = os.path.join(LEADS_DIR, OUTPUT_MD)
 
-    # Build markdown content
-    lines = []
-    lines.append("# Lead Generation Results")
-    lines.append("")
-    lines.append(f"**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    lines.append(f"**Search Center:** {center_str}")
-    lines.append(f"**Total Leads:** {len(businesses)}")
-    lines.append("")
-    lines.append("## Top Leads (sorted by score)")
-    lines.append("")
-    lines.append("| # | Name | Type | Distance | Rating | Reviews | Score | Maps |")
-    lines.append("|---|------|------|----------|--------|---------|-------|------|")
-
-    for i, b in enumerate(businesses, 1):
-        name = b.get("name", "")
-        btype = b.get("business_type", "")
-        distance = b.get("distance_km", "-")
-        rating = b.get("rating", 0)
-        reviews = b.get("review_count", 0)
-        score = b.get("lead_score", 0)
-        maps_url = b.get("maps_url", "")
-
-        # Format distance
-        if distance != "-" and distance is not None:
-            distance = f"{distance} km"
-        else:
-            distance = "-"
-
-        # Format maps link
-        maps_link = f"[Map]({maps_url})" if maps_url else "-"
-
-        # Truncate for table readability
-        if len(name) > 12:
-            name = name[:9] + "..."
-
-        lines.append(f"| {i} | {name} | {btype} | {distance} | {rating} | {reviews} | **{score}** | {maps_link} |")
-
-    lines.append("")
-    lines.append("## All Leads Detail")
-    lines.append("")
-
-    # Add detailed section for each lead
-    for i, b in enumerate(businesses, 1):
-        name = b.get("name", "")
-        btype = b.get("business_type", "")
-        address = b.get("address", "")
-        phone = b.get("phone", "N/A")
-        rating = b.get("rating", 0)
-        reviews = b.get("review_count", 0)
-        price = b.get("price_level_display", "-")
-        photos = b.get("photos_count", 0)
-        website = b.get("website", "")
-        social = b.get("social", "")
-        maps_url = b.get("maps_url", "")
-        description = b.get("description", "")
-        score = b.get("lead_score", 0)
-        status = b.get("business_status", "Unknown")
-        distance_km = b.get("distance_km")
-        distance_miles = b.get("distance_miles")
-
-        # Format distance
-        if distance_km is not None:
-            distance_str = f"{distance_km} km ({distance_miles} mi)"
-        else:
-            distance_str = "N/A"
-
-        lines.append(f"### {i}. {name}")
-        lines.append(f"**Type:** {btype} | **Distance:** {distance_str} | **Score:** {score}/165 | **Status:** {status}")
-        lines.append("")
-        lines.append(f"- **Address:** {address}")
-        lines.append(f"- **Phone:** {phone}")
-        lines.append(f"- **Rating:** {rating}/5 ({reviews} reviews)")
-        lines.append(f"- **Price Level:** {price}")
-        lines.append(f"- **Photos:** {photos}")
-        if website:
-            lines.append(f"- **Website:** {website}")
-        else:
-            lines.append(f"- **Website:** None (potential lead!)")
-        if social:
-            lines.append(f"- **Social:** {social}")
-        lines.append(f"- **Google Maps:** [View on Maps]({maps_url})")
-        lines.append(f"- **Coordinates:** {b.get('lat', 'N/A')}, {b.get('lng', 'N/A')}")
-
-        if description:
-            lines.append("")
-            lines.append(f"**Description:** {description}")
-        lines.append("")
-
-    # Summary section
-    lines.append("## Summary")
-    lines.append("")
-
-    # Calculate summary stats
-    total = len(businesses)
-    avg_rating = sum(b.get("rating", 0) for b in businesses) / total if total else 0
-    total_reviews = sum(b.get("review_count", 0) for b in businesses)
-    avg_score = sum(b.get("lead_score", 0) for b in businesses) / total if total else 0
-
-    lines.append(f"- **Total leads:** {total}")
-    lines.append(f"- **Average rating:** {avg_rating:.2f}")
-    lines.append(f"- **Total reviews:** {total_reviews}")
-    lines.append(f"- **Average lead score:** {avg_score:.1f}")
-    lines.append("")
-
-    # Business type breakdown
-    type_counts = {}
-    for b in businesses:
-        t = b.get("business_type", "unknown")
-        type_counts[t] = type_counts.get(t, 0) + 1
-
-    if type_counts:
-        lines.append("## By Business Type")
-        lines.append("")
-        for t, count in sorted(type_counts.items(), key=lambda x: -x[1]):
-            lines.append(f"- **{t}:** {count}")
-
-    with open(output_file, "w") as f:
-        f.write("\n".join(lines))
+    # Write the markdown straight to a large file buffer instead of
+    # collecting every line in memory first
+    with open(output_file, "w", buffering=1 << 20) as f:
+        w = f.write
+        w(
+            "# Lead Generation Results\n"
+            "\n"
+            f"**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+            f"**Search Center:** {center_str}\n"
+            f"**Total Leads:** {len(businesses)}\n"
+            "\n"
+            "## Top Leads (sorted by score)\n"
+            "\n"
+            "| # | Name | Type | Distance | Rating | Reviews | Score | Maps |\n"
+            "|---|------|------|----------|--------|---------|-------|------|\n"
+        )
+
+        for i, b in enumerate(businesses, 1):
+            name = b.get("name", "")
+            btype = b.get("business_type", "")
+            distance = b.get("distance_km", "-")
+            rating = b.get("rating", 0)
+            reviews = b.get("review_count", 0)
+            score = b.get("lead_score", 0)
+            maps_url = b.get("maps_url", "")
+
+            # Format distance
+            if distance != "-" and distance is not None:
+                distance = f"{distance} km"
+            else:
+                distance = "-"
+
+            # Format maps link
+            maps_link = f"[Map]({maps_url})" if maps_url else "-"
+
+            # Truncate for table readability
+            if len(name) > 12:
+                name = name[:9] + "..."
+
+            w(f"| {i} | {name} | {btype} | {distance} | {rating} | {reviews} | **{score}** | {maps_link} |\n")
+
+        w("\n## All Leads Detail\n\n")
+
+        # Add detailed section for each lead
+        for i, b in enumerate(businesses, 1):
+            name = b.get("name", "")
+            btype = b.get("business_type", "")
+            address = b.get("address", "")
+            phone = b.get("phone", "N/A")
+            rating = b.get("rating", 0)
+            reviews = b.get("review_count", 0)
+            price = b.get("price_level_display", "-")
+            photos = b.get("photos_count", 0)
+            website = b.get("website", "")
+            social = b.get("social", "")
+            maps_url = b.get("maps_url", "")
+            description = b.get("description", "")
+            score = b.get("lead_score", 0)
+            status = b.get("business_status", "Unknown")
+            distance_km = b.get("distance_km")
+            distance_miles = b.get("distance_miles")
+
+            # Format distance
+            if distance_km is not None:
+                distance_str = f"{distance_km} km ({distance_miles} mi)"
+            else:
+                distance_str = "N/A"
+
+            w(
+                f"### {i}. {name}\n"
+                f"**Type:** {btype} | **Distance:** {distance_str} | **Score:** {score}/165 | **Status:** {status}\n"
+                "\n"
+                f"- **Address:** {address}\n"
+                f"- **Phone:** {phone}\n"
+                f"- **Rating:** {rating}/5 ({reviews} reviews)\n"
+                f"- **Price Level:** {price}\n"
+                f"- **Photos:** {photos}\n"
+            )
+            if website:
+                w(f"- **Website:** {website}\n")
+            else:
+                w("- **Website:** None (potential lead!)\n")
+            if social:
+                w(f"- **Social:** {social}\n")
+            w(f"- **Google Maps:** [View on Maps]({maps_url})\n")
+            w(f"- **Coordinates:** {b.get('lat', 'N/A')}, {b.get('lng', 'N/A')}\n")
+
+            if description:
+                w(f"\n**Description:** {description}\n")
+            w("\n")
+
+        # Summary section
+        w("## Summary\n\n")
+
+        # Calculate summary stats and the type breakdown in one pass
+        total = len(businesses)
+        total_rating = total_reviews = total_score = 0
+        type_counts = Counter()
+        for b in businesses:
+            total_rating += b.get("rating", 0)
+            total_reviews += b.get("review_count", 0)
+            total_score += b.get("lead_score", 0)
+            type_counts[b.get("business_type", "unknown")] += 1
+        avg_rating = total_rating / total if total else 0
+        avg_score = total_score / total if total else 0
+
+        w(
+            f"- **Total leads:** {total}\n"
+            f"- **Average rating:** {avg_rating:.2f}\n"
+            f"- **Total reviews:** {total_reviews}\n"
+            f"- **Average lead score:** {avg_score:.1f}\n"
+        )
+
+        # Business type breakdown
+        if type_counts:
+            w("\n## By Business Type\n\n")
+            w("\n".join(
+                f"- **{t}:** {count}"
+                for t, count in sorted(type_counts.items(), key=lambda x: -x[1])
+            ))
 
     return output_file
 
 
-def export_to_json(businesses: List[dict]) -> str:
+def export_to_json(businesses: List[dict], compact: bool = False) -> str:
     """
     Export businesses to JSON file.
 
     Args:
         businesses: List of business dictionaries
+        compact: Skip indentation; much smaller and faster for large lead sets
 
     Returns:
         Path to the created JSON file
@@ -233,11 +265,18 @@ def export_to_json(businesses: List[dict]) -> str:
     if not businesses:
         return ""
 
-    os.makedirs(LEADS_DIR, exist_ok=True)
+    _ensure_leads_dir()
     output_file = os.path.join(LEADS_DIR, "leads.json")
 
-    with open(output_file, "w") as f:
-        json.dump(businesses, f, indent=2)
+    if orjson is not None:
+        with open(output_file, "wb") as f:
+            f.write(orjson.dumps(businesses, option=0 if compact else orjson.OPT_INDENT_2))
+    else:
+        with open(output_file, "w") as f:
+            if compact:
+                json.dump(businesses, f, separators=(",", ":"))
+            else:
+                json.dump(businesses, f, indent=2)
 
     return output_file
 
@@ -268,7 +307,8 @@ def print_leads(businesses: List[dict], limit: int = 20):
         print("\nNo leads found!")
         return
 
-    print(f"\n=== Found {len(businesses)} potential leads ===\n")
+    # Build the whole report and write it in one call
+    parts = [f"\n=== Found {len(businesses)} potential leads ===\n"]
 
     for i, b in enumerate(businesses[:limit], 1):
         distance_km = b.get('distance_km')
@@ -278,17 +318,20 @@ def print_leads(businesses: List[dict], limit: int = 20):
         else:
             distance = "N/A"
 
-        print(f"{i}. {b.get('name')} ({b.get('business_type', 'N/A')})")
-        print(f"   Distance: {distance}")
-        print(f"   Address: {b.get('address')}")
-        print(f"   Phone: {b.get('phone', 'N/A')}")
-        print(f"   Rating: {b.get('rating')} ({b.get('review_count')} reviews) | Price: {b.get('price_level_display', '-')}")
-        print(f"   Website: {b.get('website', 'None (potential lead!)')}")
-        print(f"   Maps: {b.get('maps_url', 'N/A')}")
-        print(f"   Lead Score: {b.get('lead_score', 0)}/165")
-        print(f"   Status: {b.get('business_status', 'Unknown')}")
-        print()
+        parts.append(
+            f"{i}. {b.get('name')} ({b.get('business_type', 'N/A')})\n"
+            f"   Distance: {distance}\n"
+            f"   Address: {b.get('address')}\n"
+            f"   Phone: {b.get('phone', 'N/A')}\n"
+            f"   Rating: {b.get('rating')} ({b.get('review_count')} reviews) | Price: {b.get('price_level_display', '-')}\n"
+            f"   Website: {b.get('website', 'None (potential lead!)')}\n"
+            f"   Maps: {b.get('maps_url', 'N/A')}\n"
+            f"   Lead Score: {b.get('lead_score', 0)}/165\n"
+            f"   Status: {b.get('business_status', 'Unknown')}\n"
+        )
 
     if len(businesses) > limit:
-        print(f"... and {len(businesses) - limit} more leads")
-        print(f"\nFull results saved to /leads")
+        parts.append(f"... and {len(businesses) - limit} more leads")
+        parts.append(f"\nFull results saved to /leads")
+
+    sys.stdout.write("\n".join(parts) + "\n")
@@ -1,6 +1,8 @@
 # filters.py
 import math
+import re
 from typing import List, Dict
+import numpy as np
 from lib.config import (
     DEFAULT_MIN_RATING,
     DEFAULT_MIN_REVIEWS,
@@ -18,104 +20,26 @@ from lib.config import (
 )
 
 
-def filter_businesses_without_websites(businesses: List[dict]) -> List[dict]:
-    """
-    Filter businesses that don't have a website.
-    A business is considered to have no website if:
-    - website is None
-    - website is empty string
-    """
-    return [
-        b for b in businesses
-        if not b.get("website") or b.get("website", "").strip() == ""
-    ]
-
-
-def filter_by_criteria(
-    businesses: List[dict],
-    require_no_website: bool = False,
-    require_no_social: bool = False,
-    require_phone: bool = False,
-    require_address: bool = False,
-    min_rating: float = None,
-    min_reviews: int = None,
-    min_photos: int = None,
-) -> List[dict]:
-    """
-    Filter businesses by user-defined criteria.
-    """
-    filtered = []
-    for b in businesses:
-        rating = b.get("rating", 0)
-        reviews = b.get("review_count", 0)
-        photos = b.get("photos_count", 0)
-
-        
-        passes = True
-        
-        if require_no_website and b.get("website"):
-            passes = False
-        if require_no_social and b.get("social"):
-            passes = False
-        if require_phone and not b.get("has_phone"):
-            passes = False
-        if require_address and not b.get("address"):
-            passes = False
-            
-        if min_rating is not None and rating < min_rating:
-            passes = False
-        if min_reviews is not None and reviews < min_reviews:
-            passes = False
-        if min_photos is not None and photos < min_photos:
-            passes = False
-
-        if passes:
-            filtered.append(b)
-
-    return filtered
-
-
-def check_quality_compliance(
-    business: dict,
-    min_rating: float = DEFAULT_MIN_RATING,
-    min_reviews: int = DEFAULT_MIN_REVIEWS,
-    min_photos: int = DEFAULT_MIN_PHOTOS,
-) -> dict:
-    """
-    Check if a business meets quality criteria and add compliance info.
-    Does NOT filter - just adds metadata.
-    Returns a dict with compliance details.
-    """
-    rating = business.get("rating", 0)
-    reviews = business.get("review_count", 0)
-    photos = business.get("photos_count", 0)
-
-    meets_rating = rating >= min_rating
-    meets_reviews = reviews >= min_reviews
-    meets_photos = photos >= min_photos
-
-    return {
-        "meets_rating": meets_rating,
-        "meets_reviews": meets_reviews,
-        "meets_photos": meets_photos,
-        "meets_quality_criteria": meets_rating and meets_reviews and meets_photos,
-    }
+# All negative keywords as one alternation, so a name is scanned once in C
+# rather than once per keyword
+_NEGATIVE_KEYWORDS_RE = re.compile("|".join(re.escape(kw.lower()) for kw in NEGATIVE_KEYWORDS))
 
 
 def check_negative_keywords(business_name: str) -> bool:
     """Check if business name contains negative keywords."""
     if not business_name:
         return False
-    name_lower = business_name.lower()
-    return any(neg in name_lower for neg in NEGATIVE_KEYWORDS)
+    return _NEGATIVE_KEYWORDS_RE.search(business_name.lower()) is not None
+
+
+EARTH_RADIUS_KM = 6371
+KM_TO_MILES = 0.621371
 
 
 def calculate_distance(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
     """
     Calculate distance between two coordinates in kilometers using Haversine formula.
     """
-    R = 6371  # Earth's radius in kilometers
-
     lat1_rad = math.radians(lat1)
     lat2_rad = math.radians(lat2)
     delta_lat = math.radians(lat2 - lat1)
@@ -125,83 +49,154 @@ def calculate_distance(lat1: float, lng1: float, lat2: float, lng2: float) -> fl
         math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lng / 2) ** 2
     c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
 
-    return R * c
+    return EARTH_RADIUS_KM * c
 
 
 def add_distances(businesses: List[dict], center_lat: float, center_lng: float) -> List[dict]:
-    """Add distance from center to each business."""
-    for b in businesses:
-        lat = b.get("lat", 0)
-        lng = b.get("lng", 0)
-        if lat and lng:
-            distance_km = calculate_distance(center_lat, center_lng, lat, lng)
-            b["distance_km"] = round(distance_km, 2)
-            b["distance_miles"] = round(distance_km * 0.621371, 2)
-        else:
-            b["distance_km"] = None
-            b["distance_miles"] = None
+    """Add distance from center to each business.
+
+    The Haversine formula runs over all coordinates at once with NumPy;
+    businesses missing either coordinate get None.
+    """
+    if not businesses:
+        return businesses
+
+    coords = np.array(
+        [(b.get("lat") or 0, b.get("lng") or 0) for b in businesses],
+        dtype=np.float64,
+    )
+    lats, lngs = coords[:, 0], coords[:, 1]
+
+    delta_lat = np.radians(lats - center_lat)
+    delta_lng = np.radians(lngs - center_lng)
+    a = np.sin(delta_lat / 2) ** 2 + \
+        math.cos(math.radians(center_lat)) * np.cos(np.radians(lats)) * np.sin(delta_lng / 2) ** 2
+    distance_km = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+    has_coords = ((lats != 0) & (lngs != 0)).tolist()
+    km = np.round(distance_km, 2).tolist()
+    miles = np.round(distance_km * KM_TO_MILES, 2).tolist()
+
+    for b, valid, d_km, d_miles in zip(businesses, has_coords, km, miles):
+        b["distance_km"] = d_km if valid else None
+        b["distance_miles"] = d_miles if valid else None
     return businesses
 
 
+# Scoring buckets as (threshold, points), highest threshold first. A value
+# earns the points of the first threshold it reaches. Both the scalar and the
+# NumPy scoring paths read these, so the rules are defined once.
+_RATING_POINTS = (
+    (SCORE_RATING_THRESHOLDS["excellent"], 30),
+    (SCORE_RATING_THRESHOLDS["good"], 20),
+    (SCORE_RATING_THRESHOLDS["fair"], 10),
+)
+_REVIEW_POINTS = (
+    (SCORE_REVIEW_THRESHOLDS["high"], 30),
+    (SCORE_REVIEW_THRESHOLDS["medium"], 20),
+    (SCORE_REVIEW_THRESHOLDS["low"], 10),
+)
+_PHOTO_POINTS = (
+    (SCORE_PHOTO_THRESHOLDS["many"], 20),
+    (SCORE_PHOTO_THRESHOLDS["some"], 10),
+)
+
+
+def _bucket_points(value: float, buckets: tuple) -> int:
+    """Points for one value from a bucket table."""
+    for threshold, points in buckets:
+        if value >= threshold:
+            return points
+    return 0
+
+
+def _bucket_points_all(values: np.ndarray, buckets: tuple) -> np.ndarray:
+    """Points for an array of values from a bucket table."""
+    return np.select(
+        [values >= threshold for threshold, _ in buckets],
+        [points for _, points in buckets],
+        default=0,
+    )
+
+
+def _profile_points(business: dict) -> int:
+    """Status bonus, profile completeness bonuses (0-30 points) and the
+    negative keyword penalty (0 to -50 points)."""
+    return (
+        (SCORE_OPERATIONAL_BONUS if business.get("business_status") == "OPERATIONAL" else 0)
+        + (SCORE_HAS_HOURS if business.get("has_hours") else 0)
+        + (SCORE_HAS_PHONE if business.get("has_phone") else 0)
+        + (SCORE_HAS_ADDRESS if business.get("address") else 0)
+        - (NEGATIVE_KEYWORD_PENALTY if check_negative_keywords(business.get("name", "")) else 0)
+    )
+
+
 def score_business(business: dict) -> int:
     """
     Score a business based on multiple quality indicators.
     Higher score = better lead quality (max ~165 points).
     """
-    score = 0
-
-    # =========================================================================
-    # Base Quality Scores (0-100 points)
-    # =========================================================================
-
-    # Rating score
-    rating = business.get("rating", 0)
-    if rating >= SCORE_RATING_THRESHOLDS["excellent"]:
-        score += 30
-    elif rating >= SCORE_RATING_THRESHOLDS["good"]:
-        score += 20
-    elif rating >= SCORE_RATING_THRESHOLDS["fair"]:
-        score += 10
-
-    # Review count score
-    reviews = business.get("review_count", 0)
-    if reviews >= SCORE_REVIEW_THRESHOLDS["high"]:
-        score += 30
-    elif reviews >= SCORE_REVIEW_THRESHOLDS["medium"]:
-        score += 20
-    elif reviews >= SCORE_REVIEW_THRESHOLDS["low"]:
-        score += 10
-
-    # Photos score
-    photos = business.get("photos_count", 0)
-    if photos >= SCORE_PHOTO_THRESHOLDS["many"]:
-        score += 20
-    elif photos >= SCORE_PHOTO_THRESHOLDS["some"]:
-        score += 10
-
-    # Business status bonus
-    if business.get("business_status") == "OPERATIONAL":
-        score += SCORE_OPERATIONAL_BONUS
-
-    # =========================================================================
-    # Profile Completeness Bonuses (0-30 points)
-    # =========================================================================
-    if business.get("has_hours"):
-        score += SCORE_HAS_HOURS
-    if business.get("has_phone"):
-        score += SCORE_HAS_PHONE
-    if business.get("address"):
-        score += SCORE_HAS_ADDRESS
-
-    # =========================================================================
-    # Negative Keyword Penalty (0 to -50 points)
-    # =========================================================================
-    business_name = business.get("name", "")
-    if check_negative_keywords(business_name):
-        score -= NEGATIVE_KEYWORD_PENALTY
+    # Base quality scores (0-80 points)
+    score = (
+        _bucket_points(business.get("rating", 0), _RATING_POINTS)
+        + _bucket_points(business.get("review_count", 0), _REVIEW_POINTS)
+        + _bucket_points(business.get("photos_count", 0), _PHOTO_POINTS)
+    )
+    # Ensure score doesn't go below 0
+    return max(0, score + _profile_points(business))
+
+
+def score_businesses_bulk(
+    businesses: List[dict],
+    ratings: List[float] = None,
+    reviews: List[int] = None,
+    photos: List[int] = None,
+) -> List[dict]:
+    """
+    Set lead_score on every business at once.
+
+    Callers that already read the rating, review and photo counts can pass
+    them in (in business order) so they aren't looked up again.
+    """
+    if not businesses:
+        return businesses
+
+    for b, score in zip(businesses, _score_all(businesses, ratings, reviews, photos)):
+        b["lead_score"] = score
+    return businesses
+
+
+def _score_all(
+    businesses: List[dict],
+    ratings: List[float] = None,
+    reviews: List[int] = None,
+    photos: List[int] = None,
+) -> List[int]:
+    """Lead scores for a non-empty list of businesses, in order.
+
+    Same rules as score_business, with the threshold buckets evaluated over
+    NumPy arrays for the whole list instead of one business at a time.
+    """
+    if ratings is None:
+        ratings = [b.get("rating", 0) for b in businesses]
+    if reviews is None:
+        reviews = [b.get("review_count", 0) for b in businesses]
+    if photos is None:
+        photos = [b.get("photos_count", 0) for b in businesses]
+
+    scores = (
+        _bucket_points_all(np.array(ratings, dtype=np.float64), _RATING_POINTS)
+        + _bucket_points_all(np.array(reviews, dtype=np.float64), _REVIEW_POINTS)
+        + _bucket_points_all(np.array(photos, dtype=np.float64), _PHOTO_POINTS)
+    )
+    profile = np.fromiter(
+        (_profile_points(b) for b in businesses),
+        dtype=np.int64,
+        count=len(businesses),
+    )
 
     # Ensure score doesn't go below 0
-    return max(0, score)
+    return np.maximum(scores + profile, 0).tolist()
 
 
 def sort_by_distance(businesses: List[dict]) -> List[dict]:
@@ -250,33 +245,47 @@ def apply_all_filters(
     if center_lat is not None and center_lng is not None:
         businesses = add_distances(businesses, center_lat, center_lng)
 
-    # Step 1: Apply explicitly requested filters
-    leads = filter_by_criteria(
-        businesses,
-        require_no_website=require_no_website,
-        require_no_social=require_no_social,
-        require_phone=require_phone,
-        require_address=require_address,
-        min_rating=min_rating,
-        min_reviews=min_reviews,
-        min_photos=min_photos,
-    )
+    # Step 1: Apply the requested filters and flag quality compliance in a
+    # single pass, reading each business's counts once
+    leads = []
+    lead_ratings, lead_reviews, lead_photos = [], [], []
+    for b in businesses:
+        rating = b.get("rating", 0)
+        reviews = b.get("review_count", 0)
+        photos = b.get("photos_count", 0)
 
-    # Step 3: Add compliance info and scores (always - don't filter, just flag)
-    for lead in leads:
-        compliance = check_quality_compliance(
-            lead,
-            min_rating=DEFAULT_MIN_RATING,
-            min_reviews=DEFAULT_MIN_REVIEWS,
-            min_photos=DEFAULT_MIN_PHOTOS,
-        )
-        lead["meets_rating"] = compliance["meets_rating"]
-        lead["meets_reviews"] = compliance["meets_reviews"]
-        lead["meets_photos"] = compliance["meets_photos"]
-        lead["meets_quality_criteria"] = compliance["meets_quality_criteria"]
-        lead["lead_score"] = score_business(lead)
-
-    # Step 4: Sort
+        if require_no_website and b.get("website"):
+            continue
+        if require_no_social and b.get("social"):
+            continue
+        if require_phone and not b.get("has_phone"):
+            continue
+        if require_address and not b.get("address"):
+            continue
+        if min_rating is not None and rating < min_rating:
+            continue
+        if min_reviews is not None and reviews < min_reviews:
+            continue
+        if min_photos is not None and photos < min_photos:
+            continue
+
+        # Compliance is only flagged, never filtered on
+        meets_rating = rating >= DEFAULT_MIN_RATING
+        meets_reviews = reviews >= DEFAULT_MIN_REVIEWS
+        meets_photos = photos >= DEFAULT_MIN_PHOTOS
+        b["meets_rating"] = meets_rating
+        b["meets_reviews"] = meets_reviews
+        b["meets_photos"] = meets_photos
+        b["meets_quality_criteria"] = meets_rating and meets_reviews and meets_photos
+        leads.append(b)
+        lead_ratings.append(rating)
+        lead_reviews.append(reviews)
+        lead_photos.append(photos)
+
+    # Step 2: Score, reusing the counts read above
+    score_businesses_bulk(leads, lead_ratings, lead_reviews, lead_photos)
+
+    # Step 3: Sort
     if sort_by == "score":
         leads = sort_by_score(leads)
     else:
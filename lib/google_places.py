@@ -1,18 +1,71 @@
 # google_places.py
 import time
+import json
+import hashlib
 import asyncio
 import aiohttp
-from typing import Optional, List, Callable, Awaitable
+from collections import deque
+from cachetools import TTLCache
+from urllib.parse import urlparse
+from typing import Optional, List, Tuple, Callable, Awaitable, Deque
 from lib.config import (
     GOOGLE_MAPS_API_KEY,
     DEFAULT_RADIUS,
     MAX_RESULTS_PER_CATEGORY,
-    VALID_PLACE_TYPES,
+    VALID_PLACE_TYPES_SET,
+    SEARCH_CACHE_TTL,
 )
 
+# orjson parses the Places pages faster; fall back to the stdlib without it
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
 # Type alias for progress callback
 ProgressCallback = Callable[[str, int, int], Awaitable[None]]
 
+# Raw places from completed searches, keyed by (API key digest, lat, lng,
+# type, radius) with coordinates rounded to ~11m, so re-running an area skips
+# the paginated API calls. Identical searches already running are awaited
+# instead of repeated.
+_search_cache = TTLCache(maxsize=256, ttl=SEARCH_CACHE_TTL) if SEARCH_CACHE_TTL > 0 else None
+_searches_in_flight = {}
+
+_SOCIAL_DOMAINS = frozenset({
+    "facebook.com",
+    "instagram.com",
+    "twitter.com",
+    "x.com",
+    "tiktok.com",
+    "linkedin.com",
+    "yelp.com",
+    "yelp.ie",
+    "goo.gl",
+})
+
+# Fields requested from searchNearby
+_FIELD_MASK = "places.id,places.displayName,places.formattedAddress,places.rating,places.userRatingCount,places.websiteUri,places.photos,places.location,places.businessStatus,places.types,places.regularOpeningHours,places.currentOpeningHours,places.nationalPhoneNumber,places.priceLevel,places.editorialSummary,places.utcOffsetMinutes,places.shortFormattedAddress"
+
+_EMPTY_SOCIAL_LINKS = {
+    "facebook_url": "",
+    "instagram_url": "",
+    "twitter_url": "",
+    "yelp_url": "",
+    "bing_url": "",
+}
+
+_PRICE_LEVEL_DISPLAY = {
+    "PRICE_LEVEL_UNSPECIFIED": "",
+    "PRICE_LEVEL_FREE": "Free",
+    "PRICE_LEVEL_INEXPENSIVE": "$",
+    "PRICE_LEVEL_MODERATE": "$$",
+    "PRICE_LEVEL_EXPENSIVE": "$$$",
+    "PRICE_LEVEL_VERY_EXPENSIVE": "$$$$",
+}
+
+_DAY_NAMES = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
 
 class RateLimiter:
     """
@@ -30,20 +83,25 @@ class RateLimiter:
         self.max_requests_per_window = max_requests_per_minute
         self.window_duration_seconds = time_window_seconds
         self.is_enabled = is_enabled
-        self._request_timestamps: List[float] = []
+        # Send times, oldest first; expired entries are popped off the left
+        self._request_timestamps: Deque[float] = deque()
         self._lock = asyncio.Lock()
 
+    def _expire(self, current_time: float) -> None:
+        """Drop timestamps that have left the window."""
+        timestamps = self._request_timestamps
+        window_start = current_time - self.window_duration_seconds
+        while timestamps and timestamps[0] <= window_start:
+            timestamps.popleft()
+
     async def wait_if_needed(self, verbose: bool = False) -> None:
         """Check if we need to wait before making another request."""
         if not self.is_enabled:
             return
 
         async with self._lock:
-            current_time = time.time()
-            self._request_timestamps = [
-                timestamp for timestamp in self._request_timestamps
-                if current_time - timestamp < self.window_duration_seconds
-            ]
+            current_time = time.monotonic()
+            self._expire(current_time)
 
             requests_at_limit = len(self._request_timestamps) >= self.max_requests_per_window
             if requests_at_limit:
@@ -54,18 +112,13 @@ class RateLimiter:
                     print(f"    Rate limit reached ({self.max_requests_per_window}/{self.window_duration_seconds}s), waiting {seconds_to_wait:.1f}s...")
 
                 await asyncio.sleep(seconds_to_wait)
+                self._expire(time.monotonic())
 
-                current_time = time.time()
-                self._request_timestamps = [
-                    timestamp for timestamp in self._request_timestamps
-                    if current_time - timestamp < self.window_duration_seconds
-                ]
-
-            self._request_timestamps.append(time.time())
+            self._request_timestamps.append(time.monotonic())
 
     def reset(self) -> None:
         """Clear the request history (useful for testing)."""
-        self._request_timestamps = []
+        self._request_timestamps.clear()
 
 
 class GooglePlacesClient:
@@ -75,15 +128,59 @@ class GooglePlacesClient:
         verbose: bool = False,
         enable_rate_limit: bool = True,
         progress_callback: ProgressCallback = None,
+        session: Optional[aiohttp.ClientSession] = None,
+        pool_size: int = 20,
     ):
         self.api_key = api_key or GOOGLE_MAPS_API_KEY
         if not self.api_key:
             raise ValueError("Google Maps API key is required")
         self.base_url = "https://places.googleapis.com/v1"
+        # Identifies the key in search cache entries without holding it there
+        self._api_key_digest = hashlib.sha256(self.api_key.encode()).digest()[:16]
+        self._request_headers = {
+            "Content-Type": "application/json",
+            "X-Goog-Api-Key": self.api_key,
+            "X-Goog-FieldMask": _FIELD_MASK,
+        }
         self.verbose = verbose
         self.rate_limiter = RateLimiter(is_enabled=enable_rate_limit)
         self.progress_callback = progress_callback
         self._is_cancelled = False
+        # Caller-owned session to reuse pooled connections across clients;
+        # without one the client opens its own on first use and keeps it
+        # until close()
+        self.session = session
+        self._owns_session = False
+        # Connections kept for our own session; every request goes to one
+        # host, so this is the per-host cap too
+        self.pool_size = pool_size
+
+    async def __aenter__(self) -> "GooglePlacesClient":
+        await self._get_session()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Return the shared session, opening one for this client if needed."""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                limit_per_host=self.pool_size,
+                ttl_dns_cache=300,
+                keepalive_timeout=60,
+            )
+            self.session = aiohttp.ClientSession(connector=connector)
+            self._owns_session = True
+        return self.session
+
+    async def close(self) -> None:
+        """Close the session if this client opened it."""
+        if self._owns_session and self.session is not None:
+            await self.session.close()
+            self.session = None
+            self._owns_session = False
 
     def cancel(self) -> None:
         """Cancel the current extraction job."""
@@ -96,11 +193,11 @@ class GooglePlacesClient:
 
         category_lower = category.lower().strip()
 
-        if category_lower in VALID_PLACE_TYPES:
+        if category_lower in VALID_PLACE_TYPES_SET:
             return category_lower
 
         singular_form = category_lower[:-1] if category_lower.endswith("s") else None
-        if singular_form and singular_form in VALID_PLACE_TYPES:
+        if singular_form and singular_form in VALID_PLACE_TYPES_SET:
             return singular_form
 
         return None
@@ -135,82 +232,141 @@ class GooglePlacesClient:
                 print(f"    Warning: '{category}' is not a valid type, skipping...")
             return []
 
-        api_url = f"{self.base_url}/places:searchNearby"
-        request_headers = {
-            "Content-Type": "application/json",
-            "X-Goog-Api-Key": self.api_key,
-            "X-Goog-FieldMask": "places.id,places.displayName,places.formattedAddress,places.rating,places.userRatingCount,places.websiteUri,places.photos,places.location,places.businessStatus,places.types,places.regularOpeningHours,places.currentOpeningHours,places.nationalPhoneNumber,places.priceLevel,places.editorialSummary,places.utcOffsetMinutes,places.shortFormattedAddress",
-        }
+        all_places = await self._search_places(lat, lng, search_type, radius, category)
+
+        if self.verbose:
+            print(f"    Total: {len(all_places)} results")
+
+        # Extraction is pure Python; run it off the loop the other categories
+        # (and other jobs) are fetching on
+        return await asyncio.to_thread(self._extract_batch, all_places, category)
 
+    def _extract_batch(self, places: List[dict], category: str = None) -> List[dict]:
+        """Extract business details for a page list, stopping on cancel."""
+        businesses = []
+        for place in places[:MAX_RESULTS_PER_CATEGORY]:
+            if self._is_cancelled:
+                break
+            business = self._extract_business_details(place, category)
+            if business:
+                businesses.append(business)
+        return businesses
+
+    async def _search_places(
+        self,
+        lat: float,
+        lng: float,
+        search_type: str,
+        radius: int,
+        category: str,
+    ) -> List[dict]:
+        """Raw places for a search, served from the search cache when possible."""
+        if _search_cache is None:
+            places, _ = await self._fetch_places(lat, lng, search_type, radius, category)
+            return places
+
+        # Scoped to the API key, so one key's results are never served to a
+        # caller whose key wasn't the one that paid for them
+        cache_key = (self._api_key_digest, round(lat, 4), round(lng, 4), search_type, radius)
+        while True:
+            cached_places = _search_cache.get(cache_key)
+            if cached_places is not None:
+                if self.verbose:
+                    print(f"    Cached: {len(cached_places)} results")
+                return cached_places
+            in_flight = _searches_in_flight.get(cache_key)
+            if in_flight is None:
+                break
+            # Another client is running this search; an incomplete run yields
+            # None and we go again
+            places = await asyncio.shield(in_flight)
+            if places is not None:
+                return places
+
+        search_done = asyncio.get_running_loop().create_future()
+        _searches_in_flight[cache_key] = search_done
+        places, is_complete = [], False
+        try:
+            places, is_complete = await self._fetch_places(lat, lng, search_type, radius, category)
+            if is_complete:
+                _search_cache[cache_key] = places
+        finally:
+            del _searches_in_flight[cache_key]
+            search_done.set_result(places if is_complete else None)
+        return places
+
+    async def _fetch_places(
+        self,
+        lat: float,
+        lng: float,
+        search_type: str,
+        radius: int,
+        category: str,
+    ) -> Tuple[List[dict], bool]:
+        """Page through searchNearby; also returns whether every page was read."""
+        api_url = f"{self.base_url}/places:searchNearby"
         all_places = []
         next_page_token = None
         max_pagination_pages = 5
         api_required_delay_seconds = 2
+        is_complete = False
 
-        async with aiohttp.ClientSession() as session:
-            for page_number in range(max_pagination_pages):
-                if self._is_cancelled:
-                    break
-
-                is_first_page = page_number == 0
-
-                if is_first_page:
-                    request_body = {
-                        "locationRestriction": {
-                            "circle": {
-                                "center": {"latitude": lat, "longitude": lng},
-                                "radius": radius,
-                            }
-                        },
-                        "includedTypes": [search_type],
-                    }
-                else:
-                    if not next_page_token:
-                        break
-                    request_body = {"pageToken": next_page_token}
-
-                try:
-                    await self.rate_limiter.wait_if_needed(verbose=self.verbose)
+        session = await self._get_session()
+        for page_number in range(max_pagination_pages):
+            if self._is_cancelled:
+                break
 
-                    async with session.post(api_url, headers=request_headers, json=request_body) as response:
-                        response.raise_for_status()
-                        response_data = await response.json()
+            is_first_page = page_number == 0
+
+            if is_first_page:
+                request_body = {
+                    "locationRestriction": {
+                        "circle": {
+                            "center": {"latitude": lat, "longitude": lng},
+                            "radius": radius,
+                        }
+                    },
+                    "includedTypes": [search_type],
+                }
+            else:
+                if not next_page_token:
+                    break
+                request_body = {"pageToken": next_page_token}
 
-                        places_on_page = response_data.get("places", [])
-                        all_places.extend(places_on_page)
+            try:
+                await self.rate_limiter.wait_if_needed(verbose=self.verbose)
 
-                        if self.verbose:
-                            print(f"    Page {page_number + 1}: {len(places_on_page)} results")
+                async with session.post(api_url, headers=self._request_headers, json=request_body) as response:
+                    response.raise_for_status()
+                    response_data = json_loads(await response.read())
 
-                        next_page_token = response_data.get("nextPageToken")
-                        has_more_pages = next_page_token is not None
+                    places_on_page = response_data.get("places", [])
+                    all_places.extend(places_on_page)
 
-                        if not has_more_pages:
-                            break
+                    if self.verbose:
+                        print(f"    Page {page_number + 1}: {len(places_on_page)} results")
 
-                        await asyncio.sleep(api_required_delay_seconds)
+                    next_page_token = response_data.get("nextPageToken")
+                    has_more_pages = next_page_token is not None
 
-                except aiohttp.ClientError as e:
-                    if self.verbose:
-                        print(f"    API Error for '{category}': {e}")
-                    break
-                except Exception as e:
-                    if self.verbose:
-                        print(f"    API Error: {e}")
-                    break
+                    if not has_more_pages:
+                        is_complete = True
+                        break
 
-        if self.verbose:
-            print(f"    Total: {len(all_places)} results")
+                    await asyncio.sleep(api_required_delay_seconds)
 
-        businesses = []
-        for place in all_places[:MAX_RESULTS_PER_CATEGORY]:
-            if self._is_cancelled:
+            except aiohttp.ClientError as e:
+                if self.verbose:
+                    print(f"    API Error for '{category}': {e}")
                 break
-            business = self._extract_business_details(place, category)
-            if business:
-                businesses.append(business)
+            except Exception as e:
+                if self.verbose:
+                    print(f"    API Error: {e}")
+                break
+        else:
+            is_complete = True
 
-        return businesses
+        return all_places, is_complete
 
     async def search_multiple_categories(
         self,
@@ -233,16 +389,24 @@ class GooglePlacesClient:
         Returns:
             List of all business details
         """
+        # Invalid categories would only take a semaphore slot and report
+        # progress for a search that never happens
+        valid_categories = [cat for cat in categories if self._get_valid_type(cat)]
+        if self.verbose and len(valid_categories) < len(categories):
+            skipped = [cat for cat in categories if not self._get_valid_type(cat)]
+            print(f"    Skipping invalid categories: {', '.join(map(str, skipped))}")
+        total_categories = len(valid_categories)
+
         semaphore = asyncio.Semaphore(max_parallel)
 
         async def search_with_semaphore(category: str) -> tuple[str, list]:
             async with semaphore:
                 if self.progress_callback:
-                    await self.progress_callback(category, 0, len(categories))
+                    await self.progress_callback(category, 0, total_categories)
                 results = await self.search_nearby(lat, lng, category, radius)
                 return category, results
 
-        tasks = [search_with_semaphore(cat) for cat in categories]
+        tasks = [search_with_semaphore(cat) for cat in valid_categories]
 
         all_businesses = []
         completed = 0
@@ -254,7 +418,7 @@ class GooglePlacesClient:
             all_businesses.extend(results)
             completed += 1
             if self.progress_callback:
-                await self.progress_callback(category, completed, len(categories))
+                await self.progress_callback(category, completed, total_categories)
 
         return all_businesses
 
@@ -321,35 +485,23 @@ class GooglePlacesClient:
 
     def _build_social_links(self, business_name: str, primary_type: str) -> dict:
         """Build social media search URLs for the business."""
-        if not business_name:
-            return {}
-
-        return {
-            "facebook_url": "",
-            "instagram_url": "",
-            "twitter_url": "",
-            "yelp_url": "",
-            "bing_url": "",
-        }
+        # Shared template; callers only ever spread it into a new dict
+        return _EMPTY_SOCIAL_LINKS if business_name else {}
 
     def _is_social_media(self, url: str) -> bool:
         """Check if URL is a social media profile rather than an actual website."""
         if not url:
             return False
-        url_lower = url.lower()
-        social_domains = [
-            "facebook.com",
-            "instagram.com",
-            "twitter.com",
-            "x.com",
-            "tiktok.com",
-            "linkedin.com",
-            "yelp.com",
-            "yelp.ie",
-            "goo.gl",
-            "maps.google",
-        ]
-        return any(domain in url_lower for domain in social_domains)
+        try:
+            host = urlparse(url if "//" in url else f"//{url}").hostname or ""
+        except ValueError:
+            return False
+        if host.startswith("maps.google."):
+            return True
+        # Match the host and each parent domain, so sub.yelp.com counts but
+        # fedex.com isn't mistaken for x.com
+        labels = host.split(".")
+        return any(".".join(labels[i:]) in _SOCIAL_DOMAINS for i in range(len(labels) - 1))
 
     def _extract_website(self, url: str) -> tuple:
         """Extract website URL and social URL separately."""
@@ -361,15 +513,7 @@ class GooglePlacesClient:
 
     def _format_price_level(self, price_level: str) -> str:
         """Convert price level to display string."""
-        mapping = {
-            "PRICE_LEVEL_UNSPECIFIED": "",
-            "PRICE_LEVEL_FREE": "Free",
-            "PRICE_LEVEL_INEXPENSIVE": "$",
-            "PRICE_LEVEL_MODERATE": "$$",
-            "PRICE_LEVEL_EXPENSIVE": "$$$",
-            "PRICE_LEVEL_VERY_EXPENSIVE": "$$$$",
-        }
-        return mapping.get(price_level, "")
+        return _PRICE_LEVEL_DISPLAY.get(price_level, "")
 
     def _format_hours(self, hours: dict) -> str:
         """Format opening hours for display."""
@@ -387,7 +531,6 @@ class GooglePlacesClient:
             return ""
 
         lines = []
-        day_names = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
         max_periods_to_show = 14
 
         for period in periods[:max_periods_to_show]:
@@ -397,7 +540,7 @@ class GooglePlacesClient:
 
             is_valid_day = 1 <= day <= 7
             if is_valid_day and open_time and close_time:
-                day_name = day_names[day - 1]
+                day_name = _DAY_NAMES[day - 1]
                 open_formatted = f"{open_time[:2]}:{open_time[2:]}" if len(open_time) >= 4 else open_time
                 close_formatted = f"{close_time[:2]}:{close_time[2:]}" if len(close_time) >= 4 else close_time
                 lines.append(f"{day_name}: {open_formatted} - {close_formatted}")
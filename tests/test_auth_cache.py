@@ -0,0 +1,73 @@
+"""Token payload cache: never outlives the token, and remembers rejections briefly."""
+from types import SimpleNamespace
+
+import pytest
+from cachetools import TTLCache
+
+from api_server import auth_cache
+
+NOW = 1_700_000_000.0
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A controllable clock driving both the cache TTLs and token expiry checks."""
+    clock = SimpleNamespace(now=NOW)
+    monkeypatch.setattr(auth_cache, "time", SimpleNamespace(time=lambda: clock.now))
+    monkeypatch.setattr(auth_cache, "_payload_cache", TTLCache(maxsize=100, ttl=300, timer=lambda: clock.now))
+    monkeypatch.setattr(auth_cache, "_rejected_cache", TTLCache(maxsize=100, ttl=30, timer=lambda: clock.now))
+    return clock
+
+
+class Verifier:
+    """Stands in for the JWT check, counting how often it runs."""
+
+    def __init__(self, payloads):
+        self.payloads = payloads
+        self.calls = 0
+
+    def __call__(self, token):
+        self.calls += 1
+        return self.payloads.get(token)
+
+
+def test_cached_payload_is_rejected_once_the_token_expires(clock):
+    verify = Verifier({"token": {"user_id": 1, "exp": NOW + 60}})
+
+    assert auth_cache.get_cached_token_payload("token", verify) == {"user_id": 1, "exp": NOW + 60}
+    clock.now += 59
+    assert auth_cache.get_cached_token_payload("token", verify) is not None
+    clock.now += 1
+    assert auth_cache.get_cached_token_payload("token", verify) is None
+
+    assert verify.calls == 1
+
+
+def test_rejected_token_stays_rejected_for_the_window(clock):
+    verify = Verifier({})
+
+    assert auth_cache.get_cached_token_payload("token", verify) is None
+    # Even if the token would now verify, the rejection stands until it ages out
+    verify.payloads["token"] = {"user_id": 1, "exp": NOW + 3600}
+    clock.now += 29
+    assert auth_cache.get_cached_token_payload("token", verify) is None
+    assert verify.calls == 1
+
+    clock.now += 1
+    assert auth_cache.get_cached_token_payload("token", verify) == {"user_id": 1, "exp": NOW + 3600}
+    assert verify.calls == 2
+
+
+def test_different_tokens_never_share_an_entry(clock):
+    verify = Verifier({
+        "token-a": {"user_id": 1, "exp": NOW + 60},
+        "token-b": {"user_id": 2, "exp": NOW + 60},
+    })
+
+    assert auth_cache.get_cached_token_payload("token-a", verify)["user_id"] == 1
+    assert auth_cache.get_cached_token_payload("token-b", verify)["user_id"] == 2
+    assert auth_cache.get_cached_token_payload("token-c", verify) is None
+    assert auth_cache.get_cached_token_payload("token-a", verify)["user_id"] == 1
+    assert auth_cache.get_cached_token_payload("token-b", verify)["user_id"] == 2
+
+    assert verify.calls == 3
@@ -0,0 +1,133 @@
+"""Schema migrations, starting from a database created by the first release."""
+import json
+import os
+import sqlite3
+import tempfile
+
+# database.py resolves its path at import time
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/leads.db")
+
+import pytest
+
+from api_server import database
+
+# Tables as the first release's init_db() created them (no user_version set)
+BASELINE_SCHEMA = """
+CREATE TABLE users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    email TEXT UNIQUE NOT NULL,
+    password_hash TEXT,
+    subscription_tier TEXT DEFAULT 'free',
+    subscription_expires_at TEXT,
+    job_credits INTEGER DEFAULT 0,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE api_keys (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    key_name TEXT NOT NULL,
+    api_key TEXT NOT NULL,
+    is_active INTEGER DEFAULT 1,
+    created_at TEXT NOT NULL,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+CREATE TABLE jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    status TEXT DEFAULT 'queued',
+    center_lat REAL NOT NULL,
+    center_lng REAL NOT NULL,
+    center_address TEXT,
+    categories TEXT,
+    radius INTEGER DEFAULT 5000,
+    min_rating REAL DEFAULT 4.0,
+    min_reviews INTEGER DEFAULT 10,
+    min_photos INTEGER DEFAULT 3,
+    use_quality_filters INTEGER DEFAULT 0,
+    sort_by TEXT DEFAULT 'score',
+    progress INTEGER DEFAULT 0,
+    total_businesses INTEGER DEFAULT 0,
+    leads_found INTEGER DEFAULT 0,
+    error_message TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    completed_at TEXT,
+    deducted_credit INTEGER DEFAULT 0,
+    require_no_website INTEGER DEFAULT 0,
+    require_no_social INTEGER DEFAULT 0,
+    require_phone INTEGER DEFAULT 0,
+    require_address INTEGER DEFAULT 0,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+CREATE TABLE results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    FOREIGN KEY (job_id) REFERENCES jobs(id) ON DELETE CASCADE
+);
+CREATE TABLE magic_links (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    token TEXT UNIQUE NOT NULL,
+    expires_at TEXT NOT NULL,
+    used_at TEXT,
+    created_at TEXT NOT NULL,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+"""
+
+NOW = "2024-01-01T00:00:00"
+
+
+@pytest.fixture
+def baseline_db(tmp_path, monkeypatch):
+    """A first-release database with one live job and one deleted job's results."""
+    path = str(tmp_path / "leads.db")
+    conn = sqlite3.connect(path)
+    conn.executescript(BASELINE_SCHEMA)
+    conn.execute("INSERT INTO users (email, created_at, updated_at) VALUES ('a@b.co', ?, ?)", (NOW, NOW))
+    for job_id in (1, 2):
+        conn.execute(
+            "INSERT INTO jobs (id, user_id, name, status, center_lat, center_lng, created_at, updated_at)"
+            " VALUES (?, 1, 'j', 'completed', 1.0, 2.0, ?, ?)",
+            (job_id, NOW, NOW)
+        )
+        leads = [{"name": f"job {job_id} lead {i}"} for i in range(3)]
+        conn.execute(
+            "INSERT INTO results (job_id, data, created_at) VALUES (?, ?, ?)",
+            (job_id, json.dumps(leads), NOW)
+        )
+    # The first release deleted jobs without enforcing foreign keys, so the
+    # results were left behind
+    conn.execute("DELETE FROM jobs WHERE id = 2")
+    conn.commit()
+    conn.close()
+
+    database.close_all()
+    monkeypatch.setattr(database, "DATABASE_PATH", path)
+    yield path
+    database.close_all()
+
+
+def test_migrates_baseline_database_with_orphaned_results(baseline_db):
+    database.init_db()
+
+    with database.get_db_cursor() as cursor:
+        cursor.execute("PRAGMA user_version")
+        assert cursor.fetchone()["user_version"] == database.SCHEMA_VERSION
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'results'")
+        assert cursor.fetchall() == []
+        cursor.execute("SELECT COUNT(*) AS total FROM result_rows WHERE job_id = 2")
+        assert cursor.fetchone()["total"] == 0
+
+    assert database.get_results_page(1, 10, 0) == [{"name": f"job 1 lead {i}"} for i in range(3)]
+
+
+def test_init_db_is_a_no_op_once_migrated(baseline_db):
+    database.init_db()
+    database.init_db()
+
+    assert database.count_results(1, None) == 3
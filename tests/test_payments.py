@@ -0,0 +1,91 @@
+"""Stripe webhook fulfillment: each event grants its tier exactly once."""
+import os
+import tempfile
+
+# database.py resolves its path at import time
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/leads.db")
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api_server import database
+from api_server.routes import payments
+
+
+@pytest.fixture
+def user_id(tmp_path, monkeypatch):
+    """A fresh database holding one free user."""
+    database.close_all()
+    monkeypatch.setattr(database, "DATABASE_PATH", str(tmp_path / "leads.db"))
+    database.init_db()
+    yield database.create_user("buyer@example.com")
+    database.close_all()
+
+
+def _credits(user_id):
+    return database.get_user_by_id(user_id)["job_credits"]
+
+
+def _recorded_events():
+    with database.get_db_cursor() as cursor:
+        cursor.execute("SELECT event_id FROM stripe_events")
+        return [row["event_id"] for row in cursor.fetchall()]
+
+
+@pytest.fixture
+def webhook(monkeypatch):
+    """Post a checkout.session.completed event, skipping signature checks."""
+    app = FastAPI()
+    app.include_router(payments.router)
+    client = TestClient(app)
+
+    def post(event_id, client_reference_id):
+        event = {
+            "id": event_id,
+            "type": "checkout.session.completed",
+            "data": {"object": {"client_reference_id": client_reference_id}},
+        }
+        monkeypatch.setattr(payments.stripe.Webhook, "construct_event", lambda *args: event)
+        return client.post("/api/payments/webhook", content=b"{}", headers={"stripe-signature": "t=1,v1=x"})
+
+    return post
+
+
+def test_duplicate_event_grants_once(user_id):
+    assert database.fulfill_stripe_event("evt_1", user_id, "single") is True
+    assert database.fulfill_stripe_event("evt_1", user_id, "single") is None
+
+    assert _credits(user_id) == 1
+
+
+def test_failed_grant_is_not_recorded_and_can_be_retried(user_id, monkeypatch):
+    apply_subscription = database._apply_subscription
+
+    def fail(cursor, user_id, tier):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(database, "_apply_subscription", fail)
+    with pytest.raises(RuntimeError):
+        database.fulfill_stripe_event("evt_1", user_id, "single")
+    assert _recorded_events() == []
+
+    monkeypatch.setattr(database, "_apply_subscription", apply_subscription)
+    assert database.fulfill_stripe_event("evt_1", user_id, "single") is True
+    assert _credits(user_id) == 1
+
+
+def test_webhook_redelivery_is_reported_as_duplicate(user_id, webhook):
+    assert webhook("evt_1", f"{user_id}_single").json() == {"status": "success"}
+    assert webhook("evt_1", f"{user_id}_single").json() == {"status": "duplicate"}
+
+    assert _credits(user_id) == 1
+
+
+def test_webhook_acknowledges_malformed_reference(user_id, webhook):
+    response = webhook("evt_1", "not-a-reference")
+
+    assert response.status_code == 200
+    assert response.json() == {"status": "success"}
+    assert _recorded_events() == []
+    assert _credits(user_id) == 0
@@ -0,0 +1,91 @@
+"""Places search cache: identical searches share one fetch, scoped to the API key."""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from cachetools import TTLCache
+
+from lib import google_places
+from lib.google_places import GooglePlacesClient
+
+LAT, LNG = 19.4326, -99.1332
+
+
+@pytest.fixture
+def fetches(monkeypatch):
+    """Stub the paginated API calls; fetches block until the test releases them."""
+    monkeypatch.setattr(google_places, "_search_cache", TTLCache(maxsize=256, ttl=3600))
+    monkeypatch.setattr(google_places, "_searches_in_flight", {})
+    state = SimpleNamespace(api_keys=[], released=False)
+
+    async def fetch_places(self, lat, lng, search_type, radius, category):
+        state.api_keys.append(self.api_key)
+        fetch_number = len(state.api_keys)
+        while not state.released:
+            await asyncio.sleep(0)
+        return [{"id": f"place-{fetch_number}", "displayName": {"text": "Taqueria"}}], True
+
+    monkeypatch.setattr(GooglePlacesClient, "_fetch_places", fetch_places)
+    return state
+
+
+def _search(api_key="key-a"):
+    client = GooglePlacesClient(api_key=api_key, enable_rate_limit=False)
+    return asyncio.ensure_future(client.search_nearby(LAT, LNG, "restaurant"))
+
+
+def test_concurrent_identical_searches_fetch_once(fetches):
+    async def run():
+        searches = [_search() for _ in range(5)]
+        await asyncio.sleep(0)
+        fetches.released = True
+        return await asyncio.gather(*searches)
+
+    results = asyncio.run(run())
+
+    assert len(fetches.api_keys) == 1
+    assert all(result == results[0] for result in results)
+    assert results[0][0]["place_id"] == "place-1"
+
+
+def test_cancelling_a_waiter_leaves_the_others_waiting(fetches):
+    async def run():
+        owner, cancelled, waiter = _search(), _search(), _search()
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        fetches.released = True
+        return await asyncio.gather(owner, waiter), cancelled.cancelled()
+
+    (owner_result, waiter_result), was_cancelled = asyncio.run(run())
+
+    assert was_cancelled
+    assert len(fetches.api_keys) == 1
+    assert waiter_result == owner_result
+
+
+def test_cancelling_the_fetching_search_hands_it_to_a_waiter(fetches):
+    async def run():
+        owner, waiter = _search(), _search()
+        await asyncio.sleep(0)
+        owner.cancel()
+        await asyncio.sleep(0)
+        fetches.released = True
+        return await waiter
+
+    result = asyncio.run(run())
+
+    assert len(fetches.api_keys) == 2
+    assert result[0]["place_id"] == "place-2"
+
+
+def test_different_api_keys_do_not_share_results(fetches):
+    async def run():
+        fetches.released = True
+        await _search("key-a")
+        await _search("key-b")
+        await _search("key-a")
+
+    asyncio.run(run())
+
+    assert fetches.api_keys == ["key-a", "key-b"]
@@ -1,13 +1,16 @@
 import json
 
-def get_keys(obj, prefix=""):
+def get_keys(root):
     keys = set()
-    for k, v in obj.items():
-        current_key = f"{prefix}.{k}" if prefix else k
-        if isinstance(v, dict):
-            keys.update(get_keys(v, current_key))
-        else:
-            keys.add(current_key)
+    stack = [("", root)]
+    while stack:
+        prefix, obj = stack.pop()
+        for k, v in obj.items():
+            current_key = f"{prefix}.{k}" if prefix else k
+            if isinstance(v, dict):
+                stack.append((current_key, v))
+            else:
+                keys.add(current_key)
     return keys
 
 with open("public/locales/en.json", "r") as f:
@@ -66,6 +66,10 @@ async function fetchApi<T>(
     throw new Error(error.detail || 'Request failed');
   }
 
+  if (response.status === 204) {
+    return undefined as T;
+  }
+
   return response.json();
 }
 
@@ -112,7 +116,7 @@ export const authApi = {
     ),
 
   logout: () =>
-    fetchApi<{ message: string }>('/api/auth/logout', {
+    fetchApi<void>('/api/auth/logout', {
       method: 'POST',
     }),
 };